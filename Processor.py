@@ -1,4 +1,11 @@
 class Processor:
-    def __init__(self, id):
+    """Lightweight view of one processor lane of a Schedule."""
+    __slots__ = ('id', 'schedule')
+
+    def __init__(self, id, schedule):
         self.id = id
-        self.task_list = []
+        self.schedule = schedule
+
+    @property
+    def task_list(self):
+        return self.schedule.tasks(self.schedule.timeline(self.id))
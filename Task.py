@@ -1,10 +1,37 @@
 class Task:
-    def __init__(self, id):
+    """
+    Lightweight view of one task of a Schedule.
+
+    The schedule itself lives in flat arrays; a view only holds the task id
+    and a reference to the schedule, so creating one per task is cheap and
+    nothing is duplicated.
+    """
+    __slots__ = ('id', 'schedule')
+
+    def __init__(self, id, schedule):
         self.id = id
-        self.processor_id = None
-        self.rank = None
-        self.comp_cost = []
-        self.weight = None
-        self.duration = {'start': None, 'end': None}
-        self.avg_comp = None
-        self.CNP = False
+        self.schedule = schedule
+
+    @property
+    def processor_id(self):
+        p = self.schedule.proc_id[self.id]
+        return None if p < 0 else int(p)
+
+    @property
+    def rank(self):
+        return float(self.schedule.rank[self.id])
+
+    @property
+    def comp_cost(self):
+        return self.schedule.comp_cost[self.id]
+
+    @property
+    def avg_comp(self):
+        return self.comp_cost.sum() / self.schedule.num_processors
+
+    @property
+    def duration(self):
+        if self.processor_id is None:
+            return {'start': None, 'end': None}
+        return {'start': float(self.schedule.start[self.id]),
+                'end': float(self.schedule.end[self.id])}
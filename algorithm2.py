@@ -1,18 +1,22 @@
-import collections
+import numpy as np
 from gurobipy import *
 from typing import List
-from Task import Task
 from heft import HEFT
+from schedule import Schedule
 from read_dag import read_dag_adjacency
-import matplotlib.pyplot as plt
+from topology import Topology
 
 # 限制 gurobi 求解时间
 softlimit = 5
 hardlimit = 120
 
 
-def softtime(model, where):
+def softtime(model, where, softlimit=softlimit, stop=None):
+    # 超过 softlimit 且 gap < 0.5 时提前结束; stop() 返回 True 时立即结束
     if where == GRB.Callback.MIP:
+        if stop is not None and stop():
+            model.terminate()
+            return
         runtime = model.cbGet(GRB.Callback.RUNTIME)
         objbst = model.cbGet(GRB.Callback.MIP_OBJBST)
         objbnd = model.cbGet(GRB.Callback.MIP_OBJBND)
@@ -34,11 +38,39 @@ def get_sub_set(nums: List[int]):
     return sub_sets
 
 
-def solveNLP(processSpeed: List[List[float]], taskWorkLoad: List[float], graph: List[List[int]], preset: List[List[int]], z: float):
+def presolve(processSpeed: List[List[float]], taskWorkLoad: List[float], graph: List[List[int]], preset: List[List[int]]):
+    # @description: preset 固定了处理器分配, 建模前先用 NumPy 算好所有由 preset 决定的量
+    # @return: dict, 不满足每个任务恰好分配到一个处理器时返回 None
+    #   p: M x N 运行时间; proc: 每个任务的处理器; pt: 每个任务在其处理器上的运行时间
+    #   src, dst: 依赖边; pairs: 需要排序变量的任务对 (同处理器且在 DAG 中不可比较)
+    #   horizon: sum(pt), 完成时间的上界, 也是 big-M
+    M, N = len(processSpeed), len(taskWorkLoad)
+    preset = np.asarray(preset)[:, :N]
+    if np.any(preset.sum(axis=0) != 1):
+        return None
+    p = np.asarray(taskWorkLoad, dtype=float)[None, :] / np.asarray(processSpeed, dtype=float)[:, :N]
+    proc = np.argmax(preset, axis=0)
+    pt = p[proc, np.arange(N)]
+
+    src, dst = np.nonzero(np.asarray(graph)[:N, :N] != 0)
+    reach = Topology(N, src, dst, np.zeros(len(src))).reachability
+    # 不同处理器的任务对不需要排序; 可比较的任务对已由依赖边排好序
+    j, k = np.triu_indices(N, 1)
+    same = proc[j] == proc[k]
+    j, k = j[same], k[same]
+    free = ~(reach.reaches_many(j, k) | reach.reaches_many(k, j))
+    return {'p': p, 'proc': proc, 'pt': pt, 'src': src, 'dst': dst,
+            'pairs': (j[free], k[free]), 'horizon': float(pt.sum())}
+
+
+def solveNLP(processSpeed: List[List[float]], taskWorkLoad: List[float], graph: List[List[int]], preset: List[List[int]], z: float,
+             softlimit: float = softlimit, hardlimit: float = hardlimit, stop=None):
     # @description: 线性规划求解
     # @param processSpeed: 二维数组，存储处理器运行任务时的速度。处理器 i 运行任务 j 的速度是 processSpeed[i][j] = s[i][j]
     # @param taskWorkLoad: 一维数组，存储任务载荷。任务 j 在处理器 i 上的运行时间是 p[i][j] =  taskWorkLoad[j] / processSpeed[i][j]
     # @param graph:二维数组，graph[j][k] == 1 代表任务 j -> k 存在一条有向边（ j ， k 邻接，且 j 需要在 k 之前执行）
+    # @param softlimit, hardlimit: 求解时间限制 (秒)
+    # @param stop: 可选的无参函数, 返回 True 时终止求解 (用于取消)
 
     # ---------- 0.初始化变量 -----------------------------------
     # M = 处理器数量；N = 任务数量
@@ -49,170 +81,64 @@ def solveNLP(processSpeed: List[List[float]], taskWorkLoad: List[float], graph:
         print('数组 taskWorkLoad 的长度和 graph 的两个维度的长度需要相同，均等于任务数量')
         return None
 
-    # 初始化运行时间数组：p[i][j]代表任务 j 在处理器 i 上的运行时间
-    p = [[taskWorkLoad[j] / processSpeed[i][j] for j in range(N)]
-         for i in range(M)]
+    # 预处理: 分配固定后运行时间是常数, 同CPU标志 c 和 before/after 都不再需要
+    pre = presolve(processSpeed, taskWorkLoad, graph, preset)
+    if pre is None:
+        print('preset 中每个任务需要恰好分配到一个处理器')
+        return None
+    p, proc, pt, horizon = pre['p'], pre['proc'], pre['pt'], pre['horizon']
 
     # ---------- 1.创建模型和变量---------------------------------
     # 创建模型
     env = Env(empty=True)
     env.setParam("OutputFlag", 0)
     env.start()
-    model = Model('nonlinear scheduling model', env=env)
-    # model = Model('nonlinear scheduling model')
-
-    # 1.1.创建目标函数变量：target = sum(Uj(T[j])) for j in N
-    target = model.addVar(lb=-GRB.INFINITY,
-                          ub=GRB.INFINITY,
-                          vtype=GRB.CONTINUOUS,
-                          name='TARGET')
-    # 1.2.创建优化变量数组T：存储完成时间(T[j])
-    T = [model.addVar(lb=0,
-                      ub=GRB.INFINITY,
+    model = Model('linear scheduling model', env=env)
+
+    # 1.1.创建优化变量数组T：存储完成时间(T[j]), pt[j] <= T[j] <= horizon
+    T = [model.addVar(lb=pt[j],
+                      ub=horizon,
                       vtype=GRB.CONTINUOUS,
                       name=f'T{j}')
          for j in range(N)]
 
-    # # 使用 preset 替代 x
-    # # 1.3.创建任务分配变量数组x：x[i][j]为 01 变量。x[i][j] == 1代表任务 j 被分配到处理器 i 中
-    # x = [[model.addVar(lb=preset[j][i],
-    #                    ub=1,
-    #                    vtype=GRB.BINARY,
-    #                    name=f'x{i}{j}') for j in range(N)]
-    #      for i in range(M)]
-
-    # 1.4.辅助变量数组c：c[j][k] == 1 代表任务 j 和任务 k 使用着同一个CPU
-    c = [[model.addVar(lb=0,
-                       ub=1,
-                       vtype=GRB.BINARY,
-                       name=f'x{j}{k}') for k in range(N)]
-         for j in range(N)]
-    # 1.5.辅助变量数组o：o[j][k] == 1 代表任务 j 在任务 k 之前
-    o = [[model.addVar(lb=0,
-                       ub=1,
-                       vtype=GRB.BINARY,
-                       name=f'o{j}{k}') for k in range(N)]
-         for j in range(N)]
-
-    # 1.6.辅助变量数组before：before[j][k] == 1 代表任务 j 在任务 k 同CPU，且 j 在 k 之前
-    before = [[model.addVar(lb=0,
-                            ub=1,
-                            vtype=GRB.BINARY,
-                            name=f'order{j}{k}') for k in range(N)]
-              for j in range(N)]
-    # 1.7.辅助变量数组after：after[j][k] == 1 代表任务 j 在任务 k 同CPU，且 j 在 k 之后
-    after = [[model.addVar(lb=0,
-                           ub=1,
-                           vtype=GRB.BINARY,
-                           name=f'order{j}{k}') for k in range(N)]
-             for j in range(N)]
-
-    # # 1.8.辅助变量数组 pt[j] 存储 pj
-    # pt = [model.addVar(lb=0,
-    #                    ub=GRB.INFINITY,
-    #                    vtype=GRB.CONTINUOUS,
-    #                    name=f'T{j}')
-    #       for j in range(N)]
+    # 1.2.排序变量o：o[j, k] == 1 代表任务 j 在任务 k 之前, 只为同CPU且不可比较的任务对创建
+    o = {(j, k): model.addVar(vtype=GRB.BINARY, name=f'o{j}_{k}')
+         for j, k in zip(*map(np.ndarray.tolist, pre['pairs']))}
 
     # ---------- 2.设置约束 --------------------------------
 
-    # 2.0.设置目标函数约束：target = max - sum(k * T[j]) + offset for j in N
-    model.setObjective(target, GRB.MAXIMIZE)
-    # 添加目标函数约束
+    # 2.0.目标函数: max offset - sum(k * T[j]) for j in N
     k, offset = 1, 10000
-    model.addQConstr((target == -quicksum(k * t for t in T) + offset),
-                     "target")
-
-    # # 设置目标函数约束：target = max sum(1 / T[j]) for j in N
-    # model.setObjective(target, GRB.MAXIMIZE)
-    # # 设置辅助变量 dt[i] = 1 / T[j]
-    # dt = [None] * N
-    # for j in range(N):
-    #     dt[j] = model.addVar(lb=0,
-    #                          ub=GRB.INFINITY,
-    #                          vtype=GRB.CONTINUOUS,
-    #                          name=f'dt{j}=1/T{j}')
-    #     model.addGenConstrPow(T[j], dt[j], -1)
-    # # 添加目标函数约束
-    # model.addQConstr(target == quicksum(c for c in dt),
-    #                  "target")
-
-    # 2.1.约束条件 sum(x[i][j]) == 1 for j in N
-    model.addConstrs(((quicksum(preset[i][j] for i in range(M)) == 1) for j in range(N)),
-                     "cpu_allocate")
-
-    # 2.2.约束条件 T[j] >= p[j] for j in N
-    model.addConstrs((T[j] >= quicksum(preset[i][j] * p[i][j] for i in range(M)) for j in range(N)),
-                     "process_time_limit")
-
-    # 2.3.辅助变量c(同CPU标志位)约束 c[j][k] = sum(preset[i][j] * preset[i][k]) for i in M
-    for j in range(N):
-        for k in range(N):
-            model.addQConstr(c[j][k] == quicksum(
-                preset[i][j] * preset[i][k] for i in range(M)))
-
-    # 2.4.约束条件 T[k] >= p[k] + T[j] for j before k
-    for k in range(N):
-        for j in range(N):
-            model.addConstr((T[k] - graph[j][k] * quicksum(preset[i][k] * p[i][k] for i in range(M)) - graph[j][k] * T[j] >= 0),
-                            "order_limit")
-
-    # 2.4.辅助变量(顺序变量)约束
-    # before[j][k] = o[j][k] * c[j][k]
-    # after[j][k] = (1 - o[j][k]) * c[j][k]
-    for j in range(N):
-        for k in range(N):
-            model.addQConstr(before[j][k] == o[j][k] * c[j][k])
-            model.addQConstr(after[j][k] == (1 - o[j][k]) * c[j][k])
-
-    # 2.5.约束条件 (T[k] >= p[k] + T[j]) or (T[j] >= p[j] + T[k]) for independent (j,k) pairs
-    for k in range(N):
-        for j in range(k):
-            model.addQConstr(
-                T[k] - quicksum(before[j][k] * preset[i][k] * p[i][k] for i in range(M)) - before[j][k] * T[j] >= 0, "order_limit")
-            model.addQConstr(
-                T[j] - quicksum(after[j][k] * preset[i][j] * p[i][j] for i in range(M)) - after[j][k] * T[k] >= 0, "order_limit")
-
-    # 2.5.松弛约束
-    # # 2.5.1 辅助约束条件 pt: pt[j] 任务 j 的完成时间
-    # model.addConstrs((pt[j] == quicksum(preset[i][j] * p[i][j] for i in range(M))
-    #                  for j in range(N)), "temp_process_time_limit")
-
-    # pt = [preset[i][j] * p[i][j] for i in range(M) for j in range(N)]
-
-    # # 2.5.2 z = max{s[i][j] / s[i'][j']}
-
-    # # 2.5.3  forall S sub N, pS = sum pj for j in S
-    # sub_tasks = get_sub_set([i for i in range(N)])
-    # for S in sub_tasks:
-    #     model.addConstr(
-    #         (quicksum(pt[j] * T[j] for j in S) -
-    #          (quicksum(pt[j] for j in S) ** 2 +
-    #           quicksum(pt[j] * pt[j] for j in S))
-    #          / (2 * M * z)) >= 0,
-    #         "relaxed_constrs")
+    model.setObjective(offset - quicksum(k * t for t in T), GRB.MAXIMIZE)
+
+    # 2.1.约束条件 T[k] >= p[k] + T[j] for j -> k
+    for j, k in zip(pre['src'].tolist(), pre['dst'].tolist()):
+        model.addConstr(T[k] - T[j] >= pt[k], "order_limit")
+
+    # 2.2.同CPU任务不重叠 (big-M): o == 1 时 j 在 k 之前, 否则 k 在 j 之前
+    for (j, k), o_jk in o.items():
+        model.addConstr(T[k] - T[j] >= pt[k] - horizon * (1 - o_jk), "cpu_order")
+        model.addConstr(T[j] - T[k] >= pt[j] - horizon * o_jk, "cpu_order")
 
     # ---------- 3.求解 -----------------------------------
     # 限制时间
     model.setParam('TimeLimit', hardlimit)
-    model.optimize(softtime)
+    model.optimize(lambda model, where: softtime(model, where, softlimit, stop))
 
     # # 不限制时间
     # model.optimize()
 
-    cpus = collections.defaultdict(list)
-    jobs = [Task(j + 1) for j in range(N)]
-
+    # 结果写入 Schedule：任务 j 运行在 proc[j] 上，完成时间 T[j]
+    schedule = Schedule(p.T)
     for j in range(N):
-        jobs[j].duration['end'] = T[j].x
-        for k in range(M):
-            if preset[k][j] == 1:
-                cpus[k].append(jobs[j])
+        schedule.place(j, proc[j], T[j].x - pt[j])
 
-    return [model.ObjVal, cpus, jobs]
+    return [model.ObjVal, schedule]
 
 
 def solution():
+    import matplotlib.pyplot as plt
     # ./daggen -n 25 --fat 0.4 --density 0.4 --regular 0.2 --jump 2 --minalpha 20 --maxalpha 200 --dot -o ../task25.dot
     files = ['task20.dot', 'task21.dot', 'task22.dot', 'task23.dot', 'task24.dot', 'task25.dot',
              'task26.dot', 'task27.dot', 'task28.dot', 'task29.dot', 'task30.dot', 'task40.dot']
@@ -250,23 +176,15 @@ def solution():
             for j in range(M):
                 presets[j][i] = 1                             # 任务 i 固定在处理器 j
                 cur_sizes = workloads[: i + 1]                # 当前任务载荷
-                utility, cpus, jobs = solveNLP(
+                utility, schedule = solveNLP(
                     processSpeed, cur_sizes, cur_adj_matrix, presets, M)
                 presets[j][i] = 0
                 # print()
                 if utility > cur_utility:
                     cur_utility = utility
                     cur_preset = [i, j]
-                cur_max_makespan = float('-inf')
                 # print('If Task {} runs on CPU {}:'.format(i + 1, j + 1))
-                for _, cpu_task in cpus.items():
-                    # print('CPU {}:'.format(_ + 1))
-                    for t in cpu_task:
-                        # print('T{}: {}'.format(t.id, t.duration['end']))
-                        cur_max_makespan = max(
-                            t.duration['end'], cur_max_makespan)
-                    # print()
-                makespan = min(makespan, cur_max_makespan)
+                makespan = min(makespan, schedule.makespan())
             # print()
             presets[cur_preset[1]][cur_preset[0]] = 1
             # print()
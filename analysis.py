@@ -0,0 +1,180 @@
+# python analysis.py results/ --by n ccr b p --plot result_comparison.png
+
+import os
+import numpy as np
+
+# DAG and sweep parameters the results can be grouped by
+PARAMS = ['n', 'b', 'ccr', 'density', 'fat', 'jump', 'regularity', 'p']
+LABELS = {'n': 'No. of nodes', 'b': 'Heterogeneity of processors',
+          'ccr': 'Communication to Computation Ratio', 'density': 'Density',
+          'fat': 'FAT', 'jump': 'Maximum jump', 'regularity': 'Regularity of DAG',
+          'p': 'No. of processors'}
+NAMES = {'prop': 'RandomHEFT'}
+
+
+def dataset(source):
+    """
+    Sweep results as an Arrow dataset, read lazily in record batches.
+
+    @param source: a Parquet / Feather file, a directory of them (e.g. the
+                   shards of a sweep), a list of files, or a Dataset
+    """
+    import pyarrow.dataset as ds
+    if isinstance(source, ds.Dataset):
+        return source
+    paths = [source] if isinstance(source, str) else list(source)
+    first = paths[0]
+    if os.path.isdir(first):
+        first = next((os.path.join(first, f) for f in sorted(os.listdir(first))
+                      if f.endswith(('.parquet', '.feather', '.arrow'))), first)
+    fmt = 'parquet' if first.endswith('.parquet') else 'feather'
+    return ds.dataset(paths[0] if len(paths) == 1 else paths, format=fmt)
+
+
+def export(pickles, out_dir):
+    # convert pickled sweep DataFrames (data.pkl, shards) to Parquet files
+    # of the same names, one at a time
+    from main_parallel import load
+    os.makedirs(out_dir, exist_ok=True)
+    for path in pickles:
+        name = os.path.splitext(os.path.basename(path))[0] + '.parquet'
+        load(path).to_parquet(os.path.join(out_dir, name), index=False)
+
+
+def algorithm_names(data, baseline='HEFT'):
+    # algorithms with a makespan column, baseline excluded
+    return [name[len('makespan_'):] for name in data.schema.names
+            if name.startswith('makespan_') and name != 'makespan_' + baseline]
+
+
+def compare(source, by, algorithms=None, baseline='HEFT', quantiles=(0.25, 0.5, 0.75)):
+    """
+    Compare algorithms with a baseline per value of the by parameters, as
+    one streaming, multi-threaded Arrow query: the data is scanned in
+    record batches and only the per-group aggregates are kept in memory.
+
+    Per group: count and, for every algorithm a,
+        <a>_improv:      mean % improvement in makespan, 100 * (1 - a / baseline)
+        <a>_win_rate:    fraction of cases with a shorter makespan
+        <a>_tie_rate:    fraction of cases with the same makespan
+        <a>_ratio_q<q>:  quantiles of a / baseline (t-digest estimates)
+        <a>_slr:         mean SLR, if the results have slr columns
+    and <baseline>_slr.
+
+    @param source: see dataset()
+    @param by: parameter name or list of names, e.g. 'ccr' or ['n', 'p']
+    @param algorithms: default all but the baseline
+    @return: pyarrow Table sorted by the group keys
+    """
+    import pyarrow as pa
+    import pyarrow.acero as ac
+    import pyarrow.compute as pc
+
+    data = dataset(source)
+    by = [by] if isinstance(by, str) else list(by)
+    algorithms = algorithm_names(data, baseline) if algorithms is None else list(algorithms)
+    names = set(data.schema.names)
+
+    exprs, columns = [pc.field(key) for key in by], list(by)
+
+    aggregates = [(by[0], 'hash_count', None, 'count')]
+    base = pc.field('makespan_' + baseline).cast(pa.float64())
+    slr = [a for a in [baseline] + algorithms if 'slr_' + a in names]
+    for a in algorithms:
+        ratio = pc.field('makespan_' + a).cast(pa.float64()) / base
+        exprs += [ratio,
+                  (pc.scalar(1.0) - ratio) * pc.scalar(100.0),
+                  pc.less(ratio, pc.scalar(1.0)).cast(pa.float64()),
+                  pc.equal(ratio, pc.scalar(1.0)).cast(pa.float64())]
+        columns += [a + '_ratio', a + '_improv', a + '_win', a + '_tie']
+        aggregates += [(a + '_improv', 'hash_mean', None, a + '_improv'),
+                       (a + '_win', 'hash_mean', None, a + '_win_rate'),
+                       (a + '_tie', 'hash_mean', None, a + '_tie_rate'),
+                       (a + '_ratio', 'hash_tdigest', pc.TDigestOptions(q=list(quantiles)),
+                        a + '_ratio_q')]
+    for a in slr:
+        exprs.append(pc.field('slr_' + a).cast(pa.float64()))
+        columns.append(a + '_slr')
+        aggregates.append((a + '_slr', 'hash_mean', None, a + '_slr'))
+
+    plan = ac.Declaration.from_sequence([
+        ac.Declaration('scan', ac.ScanNodeOptions(data)),
+        ac.Declaration('project', ac.ProjectNodeOptions(exprs, columns)),
+        ac.Declaration('aggregate', ac.AggregateNodeOptions(aggregates, keys=by)),
+    ])
+    table = plan.to_table(use_threads=True)
+
+    # one column per quantile instead of the t-digest lists
+    for a in algorithms:
+        digest = table.column(a + '_ratio_q').combine_chunks()
+        values = digest.flatten().to_numpy(zero_copy_only=False).reshape(-1, len(quantiles))
+        i = table.schema.get_field_index(a + '_ratio_q')
+        table = table.remove_column(i)
+        for j, q in reversed(list(enumerate(quantiles))):
+            table = table.add_column(i, '{}_ratio_q{:g}'.format(a, 100 * q), pa.array(values[:, j]))
+
+    # file-name parameters are stored as strings; numbers sort and plot better
+    for key in by:
+        if pa.types.is_string(table.schema.field(key).type):
+            try:
+                column = pc.cast(table.column(key), pa.float64())
+            except pa.ArrowInvalid:
+                continue
+            table = table.set_column(table.schema.get_field_index(key), key, column)
+    return table.sort_by([(key, 'ascending') for key in by])
+
+
+def plot_comparison(source, params=PARAMS, algorithms=None, baseline='HEFT', output=None):
+    """
+    The standard comparison plot (result_comparison.png): per parameter and
+    algorithm, the mean % improvement in makespan over the baseline with
+    the band between the quartiles of the improvement, each panel drawn
+    from one compare() aggregate.
+
+    @return: the figure
+    """
+    import matplotlib
+    if output:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    data = dataset(source)
+    algorithms = algorithm_names(data, baseline) if algorithms is None else list(algorithms)
+    params = [p for p in params if p in data.schema.names]
+    fig, axs = plt.subplots(len(params), len(algorithms), figsize=(7.5 * len(algorithms), 3.75 * len(params)),
+                            squeeze=False)
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    for i, param in enumerate(params):
+        table = compare(data, param, algorithms, baseline).to_pydict()
+        x = np.asarray(table[param])
+        for j, a in enumerate(algorithms):
+            ax = axs[i, j]
+            color = colors[j % len(colors)]
+            ax.plot(x, table[a + '_improv'], 'o-', c=color, label=NAMES.get(a, a))
+            # improvement quartiles are 100 * (1 - ratio quartiles), reversed
+            low = 100 * (1 - np.asarray(table[a + '_ratio_q75']))
+            high = 100 * (1 - np.asarray(table[a + '_ratio_q25']))
+            ax.fill_between(x, low, high, color=color, alpha=0.2)
+            ax.axhline(0, c='grey', lw=0.5)
+            ax.set(xlabel=LABELS.get(param, param), ylabel='% Improv in SL')
+            if i == 0:
+                ax.legend()
+    fig.tight_layout()
+    if output:
+        fig.savefig(output, dpi=150)
+    return fig
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    ap = ArgumentParser()
+    ap.add_argument('source', nargs='+', help="Parquet/Feather result files or directories")
+    ap.add_argument('--by', nargs='+', default=['ccr'])
+    ap.add_argument('--baseline', default='HEFT')
+    ap.add_argument('--plot', help="write the comparison plot to this file")
+    args = ap.parse_args()
+
+    source = args.source[0] if len(args.source) == 1 else args.source
+    print(compare(source, args.by, baseline=args.baseline).to_pandas().to_string(index=False))
+    if args.plot:
+        plot_comparison(source, baseline=args.baseline, output=args.plot)
@@ -0,0 +1,193 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from dls import DLS
+from heft import HEFT
+from ipeft import IPEFT
+from peft import PEFT
+from refine import LocalSearch
+
+# list schedulers tried after HEFT, in order
+ENSEMBLE = {'PEFT': PEFT, 'IPEFT': IPEFT, 'DLS': DLS,
+            'HEFT-dup': partial(HEFT, duplicate=True)}
+
+# local search runs in slices of this length, publishing after each one
+SLICE_MS = 20
+
+
+class AnytimeSchedule:
+    """
+    A schedule that keeps improving in a background thread until its time
+    budget runs out or it is cancelled.
+
+    best is a complete schedule at all times: HEFT's as soon as the object
+    exists, then the best one of the ensemble of list schedulers, then
+    local-search refinements of the best duplication-free one. Each
+    improvement is recorded in history as (elapsed ms, makespan, source).
+
+    Poll best / makespan from any thread, block on result(), or await the
+    object in an asyncio task. The result is set at the deadline even if an
+    ensemble member is still running; members that previous runs say will
+    not fit into the remaining budget are skipped, as are members that do
+    not support the options, with the reason in skipped.
+    """
+
+    def __init__(self, input_list, budget_ms=100, seed=None, ensemble=None, **options):
+        """
+        @param input_list: [num_tasks, num_processors, comp_cost, graph]
+        @param budget_ms: time budget from construction on, in milliseconds
+        @param seed: seed of the local search
+        @param ensemble: {name: scheduler} tried after HEFT, ENSEMBLE if None
+        @param options: passed to every scheduler (comm, contention, ...)
+        """
+        self.started = time.perf_counter()
+        self.deadline = self.started + budget_ms / 1000
+        self.input_list = input_list
+        self.seed = seed
+        self.ensemble = ENSEMBLE if ensemble is None else ensemble
+        self.options = options
+        self.history = []
+        self.skipped = []       # (name, reason) of ensemble members not run
+        self.future = Future()
+        self.__lock = threading.Lock()
+        self.__cancelled = threading.Event()
+        self.__best = None
+        self.__plain = None     # best schedule without duplicated tasks
+
+        self.__offer(HEFT(input_list=input_list, **options).schedule, 'HEFT')
+        # longest run of a list scheduler so far, the guess for the next one
+        self.__longest = time.perf_counter() - self.started
+        self.__timer = threading.Timer(max(0, self.deadline - time.perf_counter()), self.__finish)
+        self.__timer.daemon = True
+        self.__timer.start()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    @property
+    def best(self):
+        with self.__lock:
+            return self.__best
+
+    @property
+    def makespan(self):
+        return self.best.makespan()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def cancel(self):
+        # stop improving; best stays valid
+        self.__cancelled.set()
+        self.__finish()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        # wait for the budget to run out (or a cancel), return best
+        return self.future.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def __stopped(self):
+        return self.__cancelled.is_set() or time.perf_counter() >= self.deadline
+
+    def __finish(self):
+        # publish best once, from the timer, a cancel or the worker
+        self.__timer.cancel()
+        with self.__lock:
+            if not self.future.done():
+                self.future.set_result(self.__best)
+
+    def __accepts(self, algorithm):
+        # options the scheduler does not take, by its signature
+        parameters = inspect.signature(algorithm).parameters
+        if any(p.kind == p.VAR_KEYWORD for p in parameters.values()):
+            return []
+        return [k for k in self.options if k not in parameters]
+
+    def __offer(self, schedule, source):
+        makespan = schedule.makespan()
+        with self.__lock:
+            if len(schedule.dup_task) == 0 and (
+                    self.__plain is None or makespan < self.__plain.makespan()):
+                self.__plain = schedule
+            if self.__best is None or makespan < self.__best.makespan():
+                self.__best = schedule
+                self.history.append((self.elapsed_ms(), makespan, source))
+
+    def __run(self):
+        try:
+            for name, algorithm in self.ensemble.items():
+                if self.__stopped():
+                    break
+                if time.perf_counter() + self.__longest > self.deadline:
+                    self.skipped.append((name, 'would not finish within the budget'))
+                    continue
+                unsupported = self.__accepts(algorithm)
+                if unsupported:
+                    self.skipped.append((name, 'does not take {}'.format(', '.join(unsupported))))
+                    continue
+                started = time.perf_counter()
+                try:
+                    self.__offer(algorithm(input_list=self.input_list, **self.options).schedule, name)
+                except (ValueError, TypeError) as e:
+                    # option value not supported by this scheduler
+                    self.skipped.append((name, '{}: {}'.format(type(e).__name__, e)))
+                    continue
+                self.__longest = max(self.__longest, time.perf_counter() - started)
+            self.__refine()
+        finally:
+            self.__finish()
+
+    def __refine(self):
+        plain = self.__plain
+        if plain is None or self.__stopped() or plain.contention is not None or len(plain.res_proc):
+            return
+        search = LocalSearch(plain, self.seed)
+        if search.makespan < plain.makespan():
+            self.__offer(search.to_schedule(), 'local search')
+        while not self.__stopped():
+            before = search.makespan
+            remaining = (self.deadline - time.perf_counter()) * 1000
+            search.improve(min(SLICE_MS, remaining), stop=self.__stopped)
+            if search.makespan < before:
+                self.__offer(search.to_schedule(), 'local search')
+
+
+def schedule(input_list, budget_ms=100, seed=None, **options):
+    """
+    Anytime scheduling: returns at once with a HEFT schedule in .best that
+    improves until budget_ms have passed.
+
+    @return: AnytimeSchedule
+    """
+    return AnytimeSchedule(input_list, budget_ms, seed, **options)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from read_dag import read_dag, random_dag
+
+    ap = ArgumentParser()
+    ap.add_argument('-i', '--input', help="DAG description as a .dot file")
+    ap.add_argument('-n', type=int, default=200,
+                    help="number of tasks of a random DAG, if no input is given")
+    ap.add_argument('-p', type=int, default=8)
+    ap.add_argument('-b', type=float, default=0.5)
+    ap.add_argument('--ccr', type=float, default=1)
+    ap.add_argument('--budget-ms', type=float, default=500)
+    args = ap.parse_args()
+
+    if args.input:
+        inputs = read_dag(args.input, args.p, args.b, args.ccr)
+    else:
+        inputs = random_dag(args.n, args.p, args.b, args.ccr, density=3 / args.n, seed=0)
+    handle = schedule(inputs, args.budget_ms, seed=0)
+    handle.result()
+    for elapsed, makespan, source in handle.history:
+        print('{:8.1f} ms  {:12.2f}  {}'.format(elapsed, makespan, source))
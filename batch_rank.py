@@ -0,0 +1,182 @@
+import numpy as np
+from comm import CommModel
+from topology import as_topology, edge_range
+
+# bound on the (samples x edges x P [x P]) temporaries of one sweep step
+CHUNK_WORDS = 1 << 22
+
+
+def stack_inputs(input_lists):
+    """
+    Stack K cost samples of one DAG, e.g. the trials of a sweep case.
+
+    @param input_lists: read_dag style [num_tasks, num_processors, comp_cost,
+                        graph] of the same topology and processor count
+    @return: (topology, comp_cost (K, N, P), edge_cost (K, E)), edge costs
+             in the edge order of topology
+    """
+    first = as_topology(input_lists[0][3])
+    comp_cost = np.stack([np.asarray(inputs[2], dtype=float) for inputs in input_lists])
+    edge_cost = np.empty((len(input_lists), first.num_edges))
+    for k, inputs in enumerate(input_lists):
+        topo = as_topology(inputs[3])
+        if (topo.num_tasks != first.num_tasks or not np.array_equal(topo.src, first.src)
+                or not np.array_equal(topo.dst, first.dst)):
+            raise ValueError('Sample {} has a different topology'.format(k))
+        edge_cost[k] = topo.cost
+    return first, comp_cost, edge_cost
+
+
+def __chunks(topology, levels, ptr, width, skip=()):
+    # per level, groups of tasks with edges and the concatenated edge ids of
+    # each group, grouped so a (edges x width) block stays bounded
+    has = np.diff(ptr) > 0
+    has[list(skip)] = False
+    for tasks in levels:
+        tasks = tasks[has[tasks]]
+        counts = ptr[tasks + 1] - ptr[tasks]
+        bounds = np.cumsum(counts)
+        lo = 0
+        while lo < len(tasks):
+            base = bounds[lo-1] if lo else 0
+            hi = max(lo + 1, int(np.searchsorted(bounds, base + CHUNK_WORDS // width, 'right')))
+            chunk, c = tasks[lo:hi], counts[lo:hi]
+            yield chunk, edge_range(ptr, chunk), np.cumsum(c) - c
+            lo = hi
+
+
+def upward_ranks(topology, weight, edge_cost, comm=None):
+    """
+    rank[k, t] = weight[k, t] + max(0, max over successors s of
+                 mean comm cost(t, s) + rank[k, s]), HEFT's upward rank for
+    K samples in one reverse level sweep.
+
+    @param weight: (K, N) node weights
+    @param edge_cost: (K, E) edge data in topology edge order
+    @param comm: CommModel, None for the uniform one of more than one processor
+    """
+    topo = as_topology(topology)
+    K = len(weight)
+    rank = np.array(weight, dtype=float)
+    edge_cost = np.asarray(edge_cost, dtype=float)
+    mean = edge_cost if comm is None else comm.mean_cost(edge_cost)
+    for tasks, edges, offsets in __chunks(topo, topo.levels[::-1], topo.succ_ptr, K):
+        succ = topo.dst[edges]
+        best = np.maximum.reduceat(mean[:, edges] + rank[:, succ], offsets, axis=1)
+        rank[:, tasks] = weight[:, tasks] + np.maximum(0, best)
+    return rank
+
+
+def heft_ranks(topology, comp_cost, edge_cost, comm=None):
+    # (K, N) HEFT ranks, average computation cost as node weight
+    comp_cost = np.asarray(comp_cost, dtype=float)
+    P = comp_cost.shape[2]
+    return upward_ranks(topology, comp_cost.sum(axis=2) / P, edge_cost,
+                        comm or CommModel.uniform(P))
+
+
+def random_heft_weights(comp_cost):
+    # randomHEFT's node weight (w_max - w_min) / (w_max / w_min), per sample
+    comp_cost = np.asarray(comp_cost, dtype=float)
+    highest_w = comp_cost.max(axis=-1)
+    lowest_w = comp_cost.min(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(highest_w == 0, 0, (highest_w - lowest_w)/(highest_w/lowest_w))
+
+
+def random_heft_ranks(topology, comp_cost, edge_cost, comm=None):
+    # (K, N) randomHEFT ranks
+    P = np.shape(comp_cost)[2]
+    return upward_ranks(topology, random_heft_weights(comp_cost), edge_cost,
+                        comm or CommModel.uniform(P))
+
+
+def __excluding(B, reduce):
+    # out[..., p] = reduce of B[..., pm] over pm != p, via the two best values
+    P = B.shape[-1]
+    if P == 1:
+        return np.full(B.shape, -np.inf if reduce is np.maximum else np.inf)
+    best = B.argmax(axis=-1) if reduce is np.maximum else B.argmin(axis=-1)
+    first = np.take_along_axis(B, best[..., None], axis=-1)
+    rest = B.copy()
+    np.put_along_axis(rest, best[..., None], -np.inf if reduce is np.maximum else np.inf, axis=-1)
+    second = (rest.max if reduce is np.maximum else rest.min)(axis=-1, keepdims=True)
+    return np.where(np.arange(P) == best[..., None], second, first)
+
+
+def __pairs(A, c, comm, reduce):
+    # (K, m, P): for each target processor p, reduce over source processors
+    # pm of A[..., pm] + comm cost of c from p to pm (zero for pm == p)
+    if comm.is_uniform:
+        return reduce(A, __excluding(A + c[..., None], reduce))
+    pairs = A[:, :, None, :] + (c[..., None, None] * comm.inv_bandwidth + comm.latency)
+    return (pairs.max if reduce is np.maximum else pairs.min)(axis=3)
+
+
+def ipeft_ranks(topology, comp_cost, edge_cost, comm=None):
+    """
+    IPEFT's ranking for K samples at once, equal to IPEFT's own per sample.
+
+    @param comp_cost: (K, N, P)
+    @param edge_cost: (K, E) edge data in topology edge order
+    @return: dict of AEST, ALST (K, N), CN, CNP (K, N) bool, PCT, CNCT
+             (K, N, P) and rank (K, N)
+    """
+    topo = as_topology(topology)
+    comp_cost = np.asarray(comp_cost, dtype=float)
+    K, N, P = comp_cost.shape
+    comm = comm or CommModel.uniform(P)
+    avg_comp = comp_cost.sum(axis=2) / P
+    mean = comm.mean_cost(np.asarray(edge_cost, dtype=float))
+    pred_mean = mean[:, topo.pred_edge]
+    exit_id = N - 1
+
+    AEST = np.zeros((K, N))
+    for tasks, edges, offsets in __chunks(topo, topo.levels, topo.pred_ptr, K, skip=[0]):
+        pre = topo.pred_idx[edges]
+        AEST[:, tasks] = np.maximum.reduceat(AEST[:, pre] + avg_comp[:, pre] +
+                                             pred_mean[:, edges], offsets, axis=1)
+    ALST = AEST.copy()
+    for tasks, edges, offsets in __chunks(topo, topo.levels[::-1], topo.succ_ptr, K, skip=[exit_id]):
+        succ = topo.dst[edges]
+        ALST[:, tasks] = np.minimum.reduceat(ALST[:, succ] - mean[:, edges],
+                                             offsets, axis=1) - avg_comp[:, tasks]
+
+    CN = np.isclose(AEST, ALST)
+    cn_succ = np.zeros((K, N), dtype=bool)
+    np.logical_or.at(cn_succ.T, topo.src, CN[:, topo.dst].T)
+    CNP = ~CN & cn_succ
+
+    # like IPEFT, PCT and CNCT are integer arrays
+    PCT = np.zeros((K, N, P), dtype=np.int64)
+    CNCT = np.zeros((K, N, P), dtype=np.int64)
+    width = K * P * (1 if comm.is_uniform else P)
+    for tasks, edges, offsets in __chunks(topo, topo.levels[::-1], topo.succ_ptr, width, skip=[exit_id]):
+        succ = topo.dst[edges]
+        c = np.asarray(edge_cost, dtype=float)[:, edges]
+        PCT[:, tasks] = np.maximum.reduceat(
+            __pairs(PCT[:, succ] + comp_cost[:, succ], c, comm, np.maximum), offsets, axis=1)
+
+        # only critical successors count, all of them if none is critical
+        cn = CN[:, succ]
+        counts = np.diff(np.append(offsets, len(edges)))
+        any_cn = np.repeat(np.logical_or.reduceat(cn, offsets, axis=1), counts, axis=1)
+        value = __pairs(CNCT[:, succ] + comp_cost[:, succ], c, comm, np.minimum)
+        value[any_cn & ~cn] = -np.inf
+        CNCT[:, tasks] = np.maximum.reduceat(value, offsets, axis=1)
+
+    rank = np.sum(PCT, axis=2) / P + avg_comp
+    return {'AEST': AEST, 'ALST': ALST, 'CN': CN, 'CNP': CNP,
+            'PCT': PCT, 'CNCT': CNCT, 'rank': rank}
+
+
+def priority_order(rank):
+    # (K, N) scheduling order of each sample, highest rank first, ties by id
+    return np.argsort(-np.asarray(rank), axis=-1, kind='stable')
+
+
+def sample(ranks, k):
+    # the ranks of sample k, as taken by the schedulers' ranks parameter
+    if isinstance(ranks, dict):
+        return {key: value[k] for key, value in ranks.items()}
+    return ranks[k]
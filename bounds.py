@@ -0,0 +1,80 @@
+import numpy as np
+from topology import as_topology, edge_range
+
+
+def __longest(topology, w, ptr, idx, levels):
+    # longest w-path strictly before each task, levels visited in order
+    length = np.zeros(topology.num_tasks)
+    has = np.diff(ptr) > 0
+    for tasks in levels:
+        tasks = tasks[has[tasks]]
+        if tasks.size == 0:
+            continue
+        counts = ptr[tasks + 1] - ptr[tasks]
+        other = idx[edge_range(ptr, tasks)]
+        length[tasks] = np.maximum.reduceat(length[other] + w[other], np.cumsum(counts) - counts)
+    return length
+
+
+def head_tail(comp_cost, graph):
+    """
+    Longest paths with minimum computation costs and free communication.
+
+    @return: (head, tail): the longest such path ending just before each
+             task and starting just after it
+    """
+    topo = as_topology(graph)
+    w = np.asarray(comp_cost, dtype=float).min(axis=1)
+    head = __longest(topo, w, topo.pred_ptr, topo.pred_idx, topo.levels)
+    tail = __longest(topo, w, topo.succ_ptr, topo.dst, topo.levels[::-1])
+    return head, tail
+
+
+def lower_bounds(comp_cost, graph):
+    """
+    Makespan lower bounds, valid for any schedule on the same DAG, in
+    O(N * P + E).
+
+    critical_path: longest path with each task at its minimum cost and no
+                   communication
+    work:          total minimum work spread evenly over all processors
+    level:         the tasks of one topological level all run between the
+                   earliest of their heads and the latest of their tails,
+                   so max over levels of min head + level work / P + min tail
+
+    @return: dict of the three bounds and lower_bound, their maximum
+    """
+    comp_cost = np.asarray(comp_cost, dtype=float)
+    topo = as_topology(graph)
+    num_processors = comp_cost.shape[1]
+    w = comp_cost.min(axis=1)
+    head, tail = head_tail(comp_cost, topo)
+
+    bounds = {'critical_path': float(np.max(head + w + tail, initial=0)),
+              'work': float(w.sum() / num_processors),
+              'level': 0.0}
+    if topo.num_tasks:
+        order = topo.order
+        sizes = [len(tasks) for tasks in topo.levels]
+        offsets = np.cumsum(sizes) - sizes
+        level = (np.minimum.reduceat(head[order], offsets) +
+                 np.add.reduceat(w[order], offsets) / num_processors +
+                 np.minimum.reduceat(tail[order], offsets))
+        bounds['level'] = float(level.max())
+    bounds['lower_bound'] = max(bounds.values())
+    return bounds
+
+
+def metrics(makespan, comp_cost, bounds):
+    """
+    @param bounds: result of lower_bounds for the same DAG
+    @return: dict with
+             slr:     makespan / critical path at minimum costs
+             speedup: best sequential time on one processor / makespan
+             gap:     makespan / lower_bound - 1
+    """
+    sequential = float(np.asarray(comp_cost, dtype=float).sum(axis=0).min())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'slr': float(np.divide(makespan, bounds['critical_path'])),
+                'speedup': float(np.divide(sequential, makespan)),
+                'gap': float(np.divide(makespan, bounds['lower_bound'])) - 1}
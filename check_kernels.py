@@ -0,0 +1,104 @@
+# python check_kernels.py -n 200
+
+import random
+import time
+import numpy as np
+import kernels
+from comm import CommModel
+from fuzz import ALGORITHMS
+from read_dag import random_dag
+
+
+def schedules(inputs, options, seed):
+    # (rank, proc_id, start, end) of every algorithm on one DAG
+    result = {}
+    for name, algorithm in ALGORITHMS.items():
+        random.seed(seed)
+        schedule = algorithm(input_list=inputs, **options).schedule
+        result[name] = (schedule.rank, schedule.proc_id, schedule.start, schedule.end)
+    return result
+
+
+def check(iterations=200, seed=0, max_tasks=80, backend=None, verbose=False):
+    """
+    Schedule random DAGs with the NumPy kernels and with backend (numba if
+    installed, else the uncompiled loop kernels) and compare ranks and
+    schedules element by element.
+
+    @return: list of (dag seed, algorithm) whose results differ
+    """
+    backend = backend or ('numba' if kernels.numba is not None else 'python')
+    default = kernels.backend
+    differ = []
+    try:
+        for i in range(iterations):
+            dag_seed = seed + i
+            rng = np.random.default_rng(dag_seed)
+            inputs = random_dag(int(rng.integers(1, max_tasks + 1)),
+                                p=int(rng.choice([1, 2, 3, 4, 8, 16])),
+                                b=float(rng.choice([0.1, 0.5, 1, 2])),
+                                ccr=float(rng.choice([0.1, 1, 5, 10, 30])),
+                                density=float(rng.uniform(0.05, 0.8)),
+                                seed=dag_seed)
+            options = {}
+            if rng.random() < 0.5:
+                procs = np.arange(inputs[1])
+                options['comm'] = CommModel.hierarchical([procs // 2, procs // 4],
+                                                         bandwidth=rng.uniform(0.2, 5, size=3),
+                                                         latency=rng.uniform(0, 20, size=3))
+            if rng.random() < 0.5:
+                # many short reservations, so slot searches go past the
+                # first gaps of a lane
+                k = int(rng.integers(1, 200))
+                at = rng.uniform(0, 2000, size=k)
+                options['reservations'] = list(zip(rng.integers(0, inputs[1], size=k).tolist(),
+                                                   at.tolist(), (at + rng.uniform(0, 10, size=k)).tolist()))
+            kernels.use('numpy')
+            expected = schedules(inputs, options, dag_seed)
+            kernels.use(backend)
+            got = schedules(inputs, options, dag_seed)
+            for name in ALGORITHMS:
+                if not all(np.array_equal(a, b, equal_nan=True) for a, b in zip(expected[name], got[name])):
+                    differ.append((dag_seed, name))
+                    if verbose:
+                        print('seed {} {}: {} differs from numpy'.format(dag_seed, name, backend))
+    finally:
+        kernels.use(default)
+    return differ
+
+
+def bench(n=2000, p=16, seed=0):
+    # seconds per scheduler run with each available backend
+    inputs = random_dag(n, p, 0.5, 1, min(0.5, 3 / n), seed=seed)
+    default = kernels.backend
+    backends = ['numpy'] + (['numba'] if kernels.numba is not None else [])
+    try:
+        for backend in backends:
+            kernels.use(backend)
+            schedules(inputs, {}, seed)     # compile
+            for name, algorithm in ALGORITHMS.items():
+                random.seed(seed)
+                started = time.perf_counter()
+                algorithm(input_list=inputs)
+                print('{:>8} {:>12} {:>10.4f}'.format(backend, name, time.perf_counter() - started))
+    finally:
+        kernels.use(default)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    ap = ArgumentParser()
+    ap.add_argument('-n', '--iterations', type=int, default=200,
+                    help="number of random DAGs")
+    ap.add_argument('-s', '--seed', type=int, default=0)
+    ap.add_argument('--max-tasks', type=int, default=80)
+    ap.add_argument('--backend', choices=['numba', 'python'], default=None,
+                    help="backend compared with numpy, default numba if installed")
+    ap.add_argument('--bench', type=int, metavar='N', help="also time the backends on an N task DAG")
+    args = ap.parse_args()
+    differ = check(args.iterations, args.seed, args.max_tasks, args.backend, verbose=True)
+    print('{} DAGs x {} algorithms, {} differ between backends'.format(
+        args.iterations, len(ALGORITHMS), len(differ)))
+    if args.bench:
+        bench(args.bench)
+    raise SystemExit(1 if differ else 0)
@@ -0,0 +1,382 @@
+# python cli.py schedule -i test.dot --algorithm IPEFT
+# python cli.py sweep --pattern 'dag/*.dot' --processes 8
+# python cli.py sweep --shard 0/4 (one per host) && python cli.py merge data.shard-*.pkl
+# python cli.py analyze results/ --by ccr --plot result_comparison.png
+# python cli.py generate --out dag
+# python cli.py pack dag/ -o dags.dagc && python cli.py sweep --corpus dags.dagc
+# python cli.py replay failures/task20.dot_0.5_0.1_4_0-IPEFT.npz --pdb
+# python cli.py bench -n 100 1000 10000
+# python cli.py admit -i test.dot --deadline 400
+# python cli.py serve --port 8080
+
+import importlib
+import sys
+import time
+from argparse import ArgumentParser, ArgumentTypeError
+
+# scheduler name -> (module, class), imported only when used
+SCHEDULERS = {'HEFT': ('heft', 'HEFT'),
+              'HEFT-dup': ('heft', 'HEFT'),
+              'randomHEFT': ('randomHEFT', 'randomHEFT'),
+              'IPEFT': ('ipeft', 'IPEFT'),
+              'PEFT': ('peft', 'PEFT'),
+              'DLS': ('dls', 'DLS'),
+              'multilevel': ('multilevel', 'Multilevel')}
+
+
+def run(name, inputs, budget_ms=100, seed=0, **options):
+    """
+    Schedule inputs with the named algorithm ('anytime' included).
+
+    @return: Schedule
+    """
+    if name == 'anytime':
+        from anytime import schedule
+        return schedule(inputs, budget_ms, seed, **options).result()
+    module, attr = SCHEDULERS[name]
+    algorithm = getattr(importlib.import_module(module), attr)
+    if name == 'HEFT-dup':
+        options['duplicate'] = True
+    return algorithm(input_list=inputs, **options).schedule
+
+
+def load_inputs(args):
+    from read_dag import read_dag, random_dag
+    if args.input:
+        return read_dag(args.input, args.p, args.b, args.ccr)
+    density = args.density if args.density is not None else min(0.5, 3 / args.n)
+    return random_dag(args.n, args.p, args.b, args.ccr, density, seed=args.seed,
+                      sparse=args.n > 2000)
+
+
+def add_dag_arguments(ap, p=4, b=0.1, ccr=0.1):
+    ap.add_argument('-i', '--input', help="DAG description as a .dot file")
+    ap.add_argument('-n', type=int, default=100,
+                    help="number of tasks of a random DAG, if no input is given")
+    ap.add_argument('--density', type=float, default=None,
+                    help="edge density of the random DAG, default 3 / n")
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('-p', type=int, default=p, help="number of processors")
+    ap.add_argument('-b', type=float, default=b, help="heterogeneity factor")
+    ap.add_argument('--ccr', type=float, default=ccr,
+                    help="communication to computation ratio")
+
+
+def cmd_schedule(args):
+    inputs = load_inputs(args)
+    schedule = run(args.algorithm, inputs, args.budget_ms, args.seed)
+    if args.verbose:
+        print("No. of Tasks: ", inputs[0])
+        print("No. of processors: ", inputs[1])
+        print(''.join(schedule.lines(proc_offset=1, task_offset=1)), end='')
+    print("Makespan = {}".format(schedule.makespan()))
+    if args.bounds:
+        from bounds import lower_bounds, metrics
+        bounds = lower_bounds(inputs[2], inputs[3])
+        for key, value in list(bounds.items()) + list(metrics(schedule.makespan(), inputs[2], bounds).items()):
+            print('{} = {:.4f}'.format(key, value))
+    if args.csv:
+        schedule.to_csv(args.csv)
+    if args.gantt:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from gantt import plot_gantt
+        plot_gantt(schedule, title='{} makespan {:.1f}'.format(args.algorithm, schedule.makespan()))
+        plt.savefig(args.gantt, dpi=150, bbox_inches='tight')
+
+
+def shard(value):
+    # 'i/N' -> (i, N)
+    try:
+        i, n = map(int, value.split('/'))
+    except ValueError:
+        raise ArgumentTypeError('expected i/N, got {}'.format(value))
+    if not 0 <= i < n:
+        raise ArgumentTypeError('shard index must be in 0..N-1, got {}'.format(value))
+    return i, n
+
+
+def cmd_sweep(args):
+    from main_parallel import sweep
+    sweep(args.pattern, args.processes, args.trials, args.output, args.shard, args.corpus,
+          args.failures)
+
+
+def cmd_pack(args):
+    from corpus import pack
+    try:
+        count = pack(args.paths, args.output)
+    except ValueError as e:
+        sys.exit('pack failed: {}'.format(e))
+    print('{} DAGs packed into {}'.format(count, args.output))
+
+
+def cmd_merge(args):
+    from main_parallel import merge
+    try:
+        df, missing = merge(args.shards, args.output)
+    except ValueError as e:
+        sys.exit('merge failed: {}'.format(e))
+    print('{} rows from {} shards written to {}'.format(len(df), len(args.shards), args.output))
+    if missing:
+        print('{} cases missing, e.g.:'.format(len(missing)))
+        for key in missing[:10]:
+            print('  ' + key)
+        sys.exit(1)
+
+
+def cmd_analyze(args):
+    import analysis
+    source = args.source[0] if len(args.source) == 1 else args.source
+    if args.export:
+        analysis.export(args.source, args.export)
+        source = args.export
+    print(analysis.compare(source, args.by, baseline=args.baseline).to_pandas().to_string(index=False))
+    if args.plot:
+        analysis.plot_comparison(source, baseline=args.baseline, output=args.plot)
+
+
+def cmd_replay(args):
+    from replay import load_bundle, replay
+    failed = 0
+    for path in args.bundles:
+        meta = load_bundle(path)['meta']
+        print('{}: {} on {}'.format(path, meta['algorithm'], meta['key']))
+        if args.show:
+            print(meta['traceback'], end='')
+            continue
+        profile = args.profile if args.profile != '-' else True
+        _, makespan = replay(path, profile, args.pdb)
+        if makespan is None:
+            failed += 1
+        else:
+            print('did not fail, makespan = {}'.format(makespan))
+    if failed:
+        sys.exit(1)
+
+
+def cmd_generate(args):
+    import make_dags
+    values = [args.n or make_dags.n, args.fat or make_dags.fat, args.density or make_dags.density,
+              args.regularity or make_dags.regularity, args.jump or make_dags.jump]
+    written, errors = make_dags.generate(values, args.out, args.daggen, args.minalpha, args.maxalpha)
+    print('{} DAGs written to {}'.format(len(written), args.out))
+    if errors:
+        print('{} daggen runs failed, e.g.: {}'.format(len(errors), errors[0]), file=sys.stderr)
+    if not written:
+        sys.exit(1)
+
+
+def cmd_bench(args):
+    from read_dag import random_dag
+    from bounds import lower_bounds
+    print('{:>8} {:>12} {:>10} {:>14} {:>8}'.format('n', 'algorithm', 'seconds', 'makespan', 'gap'))
+    for n in args.n:
+        density = args.density if args.density is not None else min(0.5, 3 / n)
+        inputs = random_dag(n, args.p, args.b, args.ccr, density, seed=args.seed, sparse=n > 2000)
+        bound = lower_bounds(inputs[2], inputs[3])['lower_bound']
+        for name in args.algorithms:
+            best = float('inf')
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                schedule = run(name, inputs, args.budget_ms, args.seed)
+                best = min(best, time.perf_counter() - started)
+            print('{:>8} {:>12} {:>10.4f} {:>14.2f} {:>8.2%}'.format(
+                n, name, best, schedule.makespan(), schedule.makespan() / bound - 1))
+
+
+def cmd_admit(args):
+    from admission import Admission
+    inputs = load_inputs(args)
+    admission = Admission(band=tuple(args.band))
+    decision = admission.decide(inputs, args.deadline, args.free_at)
+    print('{} by {}: finish {:.2f}, deadline {:.2f}, {:.3f} ms'.format(
+        'accept' if decision.accept else 'reject', decision.stage, decision.finish,
+        args.deadline, decision.latency_ms))
+
+
+def cmd_serve(args):
+    """
+    JSON over HTTP. POST /schedule with
+        {"comp_cost": [[...], ...], "edges": [[src, dst, cost], ...],
+         "algorithm": "HEFT", "budget_ms": 100}
+    returns {"makespan", "lower_bound", "schedule": {task, proc_id, start, end}}.
+    POST /admit with comp_cost, edges, "deadline" and optionally "free_at"
+    returns {"accept", "finish", "stage", "latency_ms"}; GET /metrics the
+    admission metrics (see admission.Admission).
+    """
+    import json
+    import numpy as np
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from admission import Admission
+    from bounds import lower_bounds
+    from topology import Topology
+    quiet = args.quiet
+    admission = Admission()
+
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self.reply(200, {'status': 'ok'})
+            elif self.path == '/metrics':
+                self.reply(200, admission.metrics())
+            else:
+                self.reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path not in ('/schedule', '/admit'):
+                return self.reply(404, {'error': 'not found'})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                comp_cost = np.asarray(request['comp_cost'], dtype=float)
+                edges = np.asarray(request.get('edges', []), dtype=float).reshape(-1, 3)
+                if comp_cost.ndim != 2 or not comp_cost.size:
+                    raise ValueError('comp_cost must be a non-empty tasks x processors matrix')
+                ends = edges[:, :2]
+                if np.any((ends < 0) | (ends >= len(comp_cost)) | (ends != np.floor(ends))):
+                    raise ValueError('edge endpoints must be task ids in 0..{}'.format(len(comp_cost) - 1))
+                graph = Topology(len(comp_cost), edges[:, 0].astype(np.int64),
+                                 edges[:, 1].astype(np.int64), edges[:, 2])
+                inputs = [len(comp_cost), comp_cost.shape[1], comp_cost, graph]
+                if self.path == '/admit':
+                    decision = admission.decide(inputs, float(request['deadline']), request.get('free_at'))
+                    return self.reply(200, {'accept': bool(decision.accept), 'finish': decision.finish,
+                                            'stage': decision.stage, 'latency_ms': decision.latency_ms})
+                name = request.get('algorithm', 'HEFT')
+                if name != 'anytime' and name not in SCHEDULERS:
+                    raise ValueError('Unknown algorithm {}'.format(name))
+                schedule = run(name, inputs, request.get('budget_ms', 100))
+            except (KeyError, TypeError, ValueError, IndexError) as e:
+                return self.reply(400, {'error': '{}: {}'.format(type(e).__name__, e)})
+            columns = schedule.columns()
+            self.reply(200, {'makespan': schedule.makespan(),
+                             'lower_bound': lower_bounds(comp_cost, graph)['lower_bound'],
+                             'schedule': {k: columns[k].tolist()
+                                          for k in ('task', 'proc_id', 'start', 'end')}})
+
+        def log_message(self, format, *args):
+            if not quiet:
+                super().log_message(format, *args)
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print('Serving on {}:{}'.format(args.host, server.server_port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parser():
+    algorithms = list(SCHEDULERS) + ['anytime']
+    ap = ArgumentParser(description="Microservice DAG scheduler")
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    sp = sub.add_parser('schedule', help="schedule one DAG")
+    add_dag_arguments(sp)
+    sp.add_argument('-a', '--algorithm', choices=algorithms, default='HEFT')
+    sp.add_argument('--budget-ms', type=float, default=100, help="budget of the anytime scheduler")
+    sp.add_argument('-v', '--verbose', action='store_true', help="print the schedule")
+    sp.add_argument('--bounds', action='store_true', help="print lower bounds, SLR, speedup and gap")
+    sp.add_argument('--csv', help="write the schedule as CSV")
+    sp.add_argument('--gantt', help="write a Gantt chart image")
+    sp.set_defaults(func=cmd_schedule)
+
+    sp = sub.add_parser('sweep', help="run the ccr / b / p sweep over DAG files")
+    sp.add_argument('--pattern', default='dag/*.dot')
+    sp.add_argument('--processes', type=int, default=None)
+    sp.add_argument('--trials', type=int, default=None)
+    sp.add_argument('-o', '--output', default=None,
+                    help="default data.pkl, data.shard-i-of-N.pkl with --shard")
+    sp.add_argument('--shard', type=shard, default=None,
+                    help="i/N: run only the cases hashed to shard i of N")
+    sp.add_argument('--corpus', help="take the DAGs from this corpus archive, pattern filters names")
+    sp.add_argument('--failures', default='failures', help="directory of the replay bundles of failed cases")
+    sp.set_defaults(func=cmd_sweep)
+
+    sp = sub.add_parser('pack', help="bundle .dot files into a memory-mapped corpus archive")
+    sp.add_argument('paths', nargs='+', help=".dot files or directories")
+    sp.add_argument('-o', '--output', required=True)
+    sp.set_defaults(func=cmd_pack)
+
+    sp = sub.add_parser('merge', help="merge and check the outputs of sweep shards")
+    sp.add_argument('shards', nargs='+')
+    sp.add_argument('-o', '--output', default='data.pkl')
+    sp.set_defaults(func=cmd_merge)
+
+    sp = sub.add_parser('analyze', help="grouped comparison of sweep results (Parquet/Feather)")
+    sp.add_argument('source', nargs='+', help="result files or directories")
+    sp.add_argument('--by', nargs='+', default=['ccr'])
+    sp.add_argument('--baseline', default='HEFT')
+    sp.add_argument('--plot', help="write the comparison plot to this file")
+    sp.add_argument('--export', metavar='DIR',
+                    help="source is pickled DataFrames: convert them to Parquet in DIR first")
+    sp.set_defaults(func=cmd_analyze)
+
+    sp = sub.add_parser('replay', help="re-run the failed sweep cases of replay bundles")
+    sp.add_argument('bundles', nargs='+', help=".npz bundles written by sweep")
+    sp.add_argument('--show', action='store_true', help="print the recorded traceback instead")
+    sp.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                    help="run under cProfile, printing the stats or writing them to FILE")
+    sp.add_argument('--pdb', action='store_true', help="post-mortem debugger if it fails again")
+    sp.set_defaults(func=cmd_replay)
+
+    sp = sub.add_parser('generate', help="generate daggen DAGs over a parameter grid")
+    sp.add_argument('--out', default='dag')
+    sp.add_argument('--daggen', default='./generator/daggen')
+    sp.add_argument('--minalpha', type=int, default=20)
+    sp.add_argument('--maxalpha', type=int, default=50)
+    sp.add_argument('-n', type=int, nargs='+')
+    sp.add_argument('--fat', type=float, nargs='+')
+    sp.add_argument('--density', type=float, nargs='+')
+    sp.add_argument('--regularity', type=float, nargs='+')
+    sp.add_argument('--jump', type=int, nargs='+')
+    sp.set_defaults(func=cmd_generate)
+
+    sp = sub.add_parser('bench', help="time schedulers on random DAGs")
+    sp.add_argument('-n', type=int, nargs='+', default=[100, 1000])
+    sp.add_argument('-a', '--algorithms', nargs='+', choices=algorithms,
+                    default=['HEFT', 'IPEFT', 'PEFT', 'DLS'])
+    sp.add_argument('--density', type=float, default=None)
+    sp.add_argument('--seed', type=int, default=0)
+    sp.add_argument('-p', type=int, default=8)
+    sp.add_argument('-b', type=float, default=0.5)
+    sp.add_argument('--ccr', type=float, default=1)
+    sp.add_argument('--repeat', type=int, default=3)
+    sp.add_argument('--budget-ms', type=float, default=100)
+    sp.set_defaults(func=cmd_bench)
+
+    sp = sub.add_parser('admit', help="decide whether a DAG meets a deadline")
+    add_dag_arguments(sp)
+    sp.add_argument('--deadline', type=float, required=True)
+    sp.add_argument('--free-at', type=float, nargs='+', default=None,
+                    help="time from which each processor is free, default all 0")
+    sp.add_argument('--band', type=float, nargs=2, default=[0.8, 1.35], metavar=('LOW', 'HIGH'),
+                    help="deadline / estimate ratios that escalate to full scheduling")
+    sp.set_defaults(func=cmd_admit)
+
+    sp = sub.add_parser('serve', help="serve schedules as JSON over HTTP")
+    sp.add_argument('--host', default='127.0.0.1')
+    sp.add_argument('--port', type=int, default=8080)
+    sp.add_argument('-q', '--quiet', action='store_true')
+    sp.set_defaults(func=cmd_serve)
+    return ap
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
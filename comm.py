@@ -0,0 +1,86 @@
+import numpy as np
+
+
+class CommModel:
+    """
+    Communication time of a message between two processors:
+
+        data_size * inv_bandwidth[p_src, p_dst] + latency[p_src, p_dst]
+
+    and zero between a processor and itself. The edge costs of the task graph
+    are the data sizes. The uniform model (unit inverse bandwidth, no latency
+    between distinct processors) is the original one, where every edge has
+    one cost paid whenever its ends run on different processors.
+
+    Only (P, P) matrices are stored; arrival times are built per task as
+    (k, P) rows of the source processors, never one entry per edge and
+    processor pair.
+    """
+
+    def __init__(self, inv_bandwidth, latency=None):
+        """
+        @param inv_bandwidth: (P, P) time per unit of data between processors
+        @param latency: (P, P) fixed cost per message, default 0
+        """
+        self.inv_bandwidth = np.array(inv_bandwidth, dtype=float)
+        self.num_processors = P = len(self.inv_bandwidth)
+        self.latency = (np.zeros((P, P)) if latency is None
+                        else np.array(latency, dtype=float))
+        np.fill_diagonal(self.inv_bandwidth, 0)
+        np.fill_diagonal(self.latency, 0)
+
+        # averages over pairs of distinct processors, used by the rankings
+        remote = ~np.eye(P, dtype=bool)
+        self.mean_inv_bandwidth = float(self.inv_bandwidth[remote].mean()) if P > 1 else 0.0
+        self.mean_latency = float(self.latency[remote].mean()) if P > 1 else 0.0
+        self.is_uniform = bool(np.all(self.inv_bandwidth[remote] == 1) and
+                               not np.any(self.latency))
+
+    @classmethod
+    def uniform(cls, num_processors):
+        return cls(np.ones((num_processors, num_processors)))
+
+    @classmethod
+    def from_bandwidth(cls, bandwidth, latency=None):
+        # bandwidth matrix, inf for free links
+        with np.errstate(divide='ignore'):
+            return cls(1 / np.asarray(bandwidth, dtype=float), latency)
+
+    @classmethod
+    def hierarchical(cls, groups, bandwidth, latency=None):
+        """
+        Rack / zone style model: the cost of a pair depends on the innermost
+        group both processors belong to.
+
+        @param groups: group id per processor for each tier, innermost first,
+                       e.g. [rack_of, zone_of]
+        @param bandwidth: bandwidth inside each tier plus one for pairs that
+                          share no group, e.g. (rack, zone, remote)
+        @param latency: latency per tier in the same layout, default 0
+        """
+        groups = [np.asarray(g) for g in groups]
+        P = len(groups[0])
+        tier = np.full((P, P), len(groups))
+        for i in reversed(range(len(groups))):
+            tier[groups[i][:, None] == groups[i][None, :]] = i
+        with np.errstate(divide='ignore'):
+            inv = 1 / np.asarray(bandwidth, dtype=float)
+        lat = np.zeros(len(groups) + 1) if latency is None else np.asarray(latency, dtype=float)
+        return cls(inv[tier], lat[tier])
+
+    def arrival(self, end, data, src):
+        # (k, P): when k messages of size data, sent at end from processors
+        # src, are available on each processor
+        return end[:, None] + (data[:, None] * self.inv_bandwidth[src] + self.latency[src])
+
+    def cost(self, data, src, dst):
+        # elementwise message time from src to dst
+        return data * self.inv_bandwidth[src, dst] + self.latency[src, dst]
+
+    def mean_cost(self, data):
+        # expected message time between two distinct processors
+        return data * self.mean_inv_bandwidth + self.mean_latency
+
+    def pair_costs(self, data):
+        # (k, P, P) message time of k edges for every processor pair
+        return data[:, None, None] * self.inv_bandwidth + self.latency
@@ -0,0 +1,189 @@
+# python corpus.py pack dag/ -o dags.dagc
+# python corpus.py ls dags.dagc
+
+import collections
+import json
+import mmap
+import os
+import re
+import numpy as np
+from read_dag import dag_inputs
+
+MAGIC = b'DAGCORP1'
+HEADER = 64         # magic, index offset and index size, padded
+ALIGN = 64
+
+# daggen parameters identifying a DAG of the sweep grid, in file-name order
+KEYS = ['n', 'fat', 'density', 'regular', 'jump']
+
+# zero-copy views of one DAG: node ids and alpha sizes in file order, edges
+# (1-based ids) in file order
+DagArrays = collections.namedtuple('DagArrays', ['node_ids', 'alpha', 'src', 'dst'])
+
+NODE = re.compile(r'^\s*(\d+)\s*\[(.*)\]')
+EDGE = re.compile(r'^\s*(\d+)\s*->\s*(\d+)')
+ALPHA = re.compile(r'alpha\s*=\s*"([^"]*)"')
+OPTION = re.compile(r'(?:^|\s)--?(\w+)\s+([^\s-][^\s]*)')
+
+
+def parse_dot(filename):
+    """
+    Parse a daggen .dot file without pydot.
+
+    @return: (DagArrays, params), params being the daggen options of the
+             header comment (n, fat, density, regular, jump, minalpha, ...)
+    """
+    node_ids, alpha, src, dst, params = [], [], [], [], {}
+    with open(filename) as f:
+        for line in f:
+            edge = EDGE.match(line)
+            if edge:
+                src.append(int(edge.group(1)))
+                dst.append(int(edge.group(2)))
+                continue
+            node = NODE.match(line)
+            if node:
+                node_ids.append(int(node.group(1)))
+                alpha.append(float(ALPHA.search(node.group(2)).group(1)))
+            elif line.startswith('//') and 'daggen' in line and '--' in line:
+                for key, value in OPTION.findall(line):
+                    if key not in ('o', 'dot'):
+                        params[key] = int(value) if value.isdigit() else float(value)
+    arrays = DagArrays(np.array(node_ids, dtype=np.int32), np.array(alpha, dtype=float),
+                       np.array(src, dtype=np.int32), np.array(dst, dtype=np.int32))
+    return arrays, params
+
+
+def pack(paths, output):
+    """
+    Bundle .dot files into one corpus archive: the arrays of every DAG,
+    aligned, followed by a JSON index of names, parameters and offsets.
+    Written to a temporary file and renamed, so readers never see a
+    partial archive.
+
+    @param paths: .dot files, or directories of them
+    @return: number of DAGs
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.dot'))
+        else:
+            files.append(path)
+    if not files:
+        raise ValueError('No .dot files in {}'.format(', '.join(paths)))
+
+    index = []
+    tmp = output + '.tmp'
+    with open(tmp, 'wb') as out:
+        out.write(b'\0' * HEADER)
+        for filename in files:
+            arrays, params = parse_dot(filename)
+            entry = {'name': os.path.basename(filename), 'params': params,
+                     'n': len(arrays.node_ids), 'm': len(arrays.src), 'arrays': {}}
+            for field, array in zip(DagArrays._fields, arrays):
+                out.write(b'\0' * (-out.tell() % ALIGN))
+                entry['arrays'][field] = out.tell()
+                out.write(array.tobytes())
+            index.append(entry)
+        offset = out.tell()
+        data = json.dumps({'dtypes': {'node_ids': '<i4', 'alpha': '<f8', 'src': '<i4', 'dst': '<i4'},
+                           'dags': index}).encode()
+        out.write(data)
+        out.seek(0)
+        out.write(MAGIC + np.array([offset, len(data)], dtype='<u8').tobytes())
+    os.replace(tmp, output)
+    return len(index)
+
+
+class Corpus:
+    """
+    Read-only, memory-mapped corpus archive. The arrays of a DAG are NumPy
+    views into the mapping, so opening and reading DAGs costs no parsing
+    and no copies, and processes share the pages through the OS cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__map[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a DAG corpus'.format(path))
+        offset, size = np.frombuffer(self.__map, dtype='<u8', count=2, offset=len(MAGIC))
+        index = json.loads(self.__map[int(offset):int(offset + size)])
+        self.dtypes = index['dtypes']
+        self.index = {entry['name']: entry for entry in index['dags']}
+        self.__by_params = {}
+        for entry in index['dags']:
+            key = tuple(entry['params'].get(k) for k in KEYS)
+            self.__by_params.setdefault(key, entry['name'])
+
+    @property
+    def names(self):
+        return list(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def arrays(self, name):
+        # DagArrays of a DAG by name or by (n, fat, density, regular, jump)
+        entry = self.index[self.name(name)]
+        counts = {'node_ids': entry['n'], 'alpha': entry['n'], 'src': entry['m'], 'dst': entry['m']}
+        return DagArrays(*(np.frombuffer(self.__map, dtype=self.dtypes[field], count=counts[field],
+                                         offset=entry['arrays'][field])
+                           for field in DagArrays._fields))
+
+    def params(self, name):
+        return self.index[self.name(name)]['params']
+
+    def name(self, key):
+        # a name, or the name of the DAG with these KEYS parameters
+        if isinstance(key, str):
+            return key
+        return self.__by_params[tuple(key)]
+
+    def find(self, **params):
+        # names of the DAGs whose daggen parameters match all given ones
+        return [name for name, entry in self.index.items()
+                if all(entry['params'].get(k) == v for k, v in params.items())]
+
+    def read_dag(self, name, p=3, b=0.5, ccr=0.5):
+        # same as read_dag on the original file, for the same random state
+        arrays = self.arrays(name)
+        return dag_inputs(arrays.node_ids, arrays.alpha, arrays.src, arrays.dst, p, b, ccr)
+
+
+# corpora opened by this process, shared by all callers (e.g. sweep cases)
+__open = {}
+
+
+def open_corpus(path):
+    if path not in __open:
+        __open[path] = Corpus(path)
+    return __open[path]
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    ap = ArgumentParser()
+    sub = ap.add_subparsers(dest='command', required=True)
+    sp = sub.add_parser('pack', help="bundle .dot files into a corpus archive")
+    sp.add_argument('paths', nargs='+', help=".dot files or directories")
+    sp.add_argument('-o', '--output', required=True)
+    sp = sub.add_parser('ls', help="list the DAGs of a corpus")
+    sp.add_argument('corpus')
+    args = ap.parse_args()
+
+    if args.command == 'pack':
+        print('{} DAGs packed into {}'.format(pack(args.paths, args.output), args.output))
+    else:
+        corpus = Corpus(args.corpus)
+        for name in corpus:
+            entry = corpus.index[name]
+            print('{}  n={} m={}  {}'.format(name, entry['n'], entry['m'], entry['params']))
@@ -0,0 +1,137 @@
+from read_dag import read_dag
+import heapq
+import numpy as np
+from schedule import Schedule
+from topology import as_topology, edge_range
+
+
+class DLS:
+    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5,
+                 comm=None, contention=None, reservations=None, availability=None):
+        """
+        Dynamic Level Scheduling (Sih & Lee, 1993).
+
+        Among the ready tasks, the (task, processor) pair with the highest
+        dynamic level DL(t, p) = SL(t) - EST(t, p) + (avg w(t) - w(t, p))
+        is placed next, SL being the static level (longest average
+        computation path to an exit, without communication).
+
+        Ready tasks sit in a heap keyed by their best DL. Placing a task on
+        p only fills time on p, so afterwards DL(t, p) can only drop and the
+        other DL(t, q) stay put. Every ready task keeps its DL per processor
+        with the placement count of that processor it was computed at; a
+        value is stale, and then an upper bound, once the processor was used
+        since. Only the best value is ever refreshed, until the best one is
+        current, and a popped task whose key dropped is pushed back.
+        """
+        if input_list is None and file is not None:
+            self.num_tasks, self.num_processors, comp_cost, self.graph = read_dag(
+                file, p, b, ccr)
+        elif len(input_list) == 4 and file is None:
+            self.num_tasks, self.num_processors, comp_cost, self.graph = input_list
+        else:
+            print('Enter filename or input params')
+            raise Exception()
+
+        if verbose:
+            print("No. of Tasks: ", self.num_tasks)
+            print("No. of processors: ", self.num_processors)
+
+        self.topology = as_topology(self.graph)
+        self.schedule = Schedule(comp_cost, self.topology, comm, contention)
+        self.schedule.load_reservations(reservations, availability)
+        self.comp_cost = self.schedule.comp_cost
+        self.avg_comp = self.comp_cost.sum(axis=1) / self.num_processors
+
+        self.__computeStaticLevels()
+        self.schedule.rank[:] = self.SL
+
+        if verbose:
+            print('SL: ', self.SL)
+
+        self.__allotProcessor()
+        self.makespan = self.schedule.makespan()
+
+    @property
+    def tasks(self):
+        # Task views in scheduling order
+        return self.schedule.tasks(self.order)
+
+    @property
+    def processors(self):
+        return self.schedule.processors()
+
+    def __computeStaticLevels(self):
+        # SL[t] = avg w(t) + max over successors SL[s], one level at a time
+        topo = self.topology
+        self.SL = self.avg_comp.copy()
+        has_succ = np.diff(topo.succ_ptr) > 0
+        for tasks in reversed(topo.levels):
+            tasks = tasks[has_succ[tasks]]
+            if tasks.size == 0:
+                continue
+            counts = topo.succ_ptr[tasks + 1] - topo.succ_ptr[tasks]
+            succ = topo.dst[edge_range(topo.succ_ptr, tasks)]
+            self.SL[tasks] += np.maximum.reduceat(self.SL[succ], np.cumsum(counts) - counts)
+
+    def __allotProcessor(self):
+        topo = self.topology
+        lanes = self.schedule.lanes
+        indeg = np.diff(topo.pred_ptr)
+        # placements per processor; per ready task its ready times, DLs and
+        # the placement counts they were computed at. Link contention makes
+        # ready times depend on every placement, so then all is recomputed.
+        used = np.zeros(self.num_processors, dtype=np.int64)
+        partial = self.schedule.contention is None
+        state = {}
+
+        def entry(t):
+            w = self.comp_cost[t]
+            bonus = self.SL[t] + self.avg_comp[t] - w
+            if partial and t in state:
+                ready, est, dl, seen = state[t]
+            else:
+                ready = self.schedule.ready_times(t)
+                est = self.schedule.earliest_starts(t, ready)
+                dl = bonus - est
+                seen = used.copy()
+                state[t] = ready, est, dl, seen
+            p = int(np.argmax(dl))
+            while seen[p] != used[p]:
+                est[p] = lanes[p].earliest_start(ready[p], w[p])
+                dl[p] = bonus[p] - est[p]
+                seen[p] = used[p]
+                p = int(np.argmax(dl))
+            return (-float(dl[p]), t, p, used[p], est[p])
+
+        ready = [entry(t) for t in np.flatnonzero(indeg == 0).tolist()]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, t, p, stamp, est = heapq.heappop(ready)
+            if stamp != used[p] or not partial:
+                item = entry(t)
+                if ready and item[0] > ready[0][0]:
+                    heapq.heappush(ready, item)
+                    continue
+                _, _, p, _, est = item
+            self.schedule.place(t, p, est)
+            state.pop(t, None)
+            used[p] += 1
+            order.append(t)
+            for s in topo.successors(t)[0].tolist():
+                indeg[s] -= 1
+                if indeg[s] == 0:
+                    heapq.heappush(ready, entry(s))
+        self.order = np.array(order, dtype=np.int64)
+
+    def __str__(self):
+        lines = list(self.schedule.lines(proc_offset=1, task_offset=1))
+        lines.append("Makespan = {}\n".format(self.makespan))
+        return ''.join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+    main(['schedule', '--algorithm', 'DLS'] + sys.argv[1:])
@@ -0,0 +1,95 @@
+# python fuzz.py -n 2000
+
+import random
+from functools import partial
+import numpy as np
+from dls import DLS
+from heft import HEFT
+from ipeft import IPEFT
+from admission import estimate
+from bounds import lower_bounds
+from comm import CommModel
+from peft import PEFT
+from randomHEFT import randomHEFT
+from read_dag import random_dag
+from validate import validate
+
+ALGORITHMS = {'HEFT': HEFT, 'randomHEFT': randomHEFT, 'IPEFT': IPEFT,
+              'PEFT': PEFT, 'DLS': DLS, 'HEFT-dup': partial(HEFT, duplicate=True)}
+
+
+def fuzz(iterations=1000, seed=0, max_tasks=60, verbose=False):
+    """
+    Run every scheduler on random DAGs and validate each schedule.
+
+    @param iterations: number of random DAGs
+    @param seed: base seed; DAG i uses seed + i, so failures can be replayed
+    @param max_tasks: upper bound on the number of tasks per DAG
+    @return: list of (dag seed, algorithm, violations)
+    """
+    failures = []
+    for i in range(iterations):
+        dag_seed = seed + i
+        rng = np.random.default_rng(dag_seed)
+        inputs = random_dag(int(rng.integers(1, max_tasks + 1)),
+                            p=int(rng.choice([2, 3, 4, 8, 16, 32])),
+                            b=float(rng.choice([0.1, 0.5, 1, 2])),
+                            ccr=float(rng.choice([0.1, 1, 5, 10, 30])),
+                            density=float(rng.uniform(0.05, 0.8)),
+                            seed=dag_seed)
+        comm = None
+        if rng.random() < 0.5:
+            # racks of 2 and zones of 4 processors
+            procs = np.arange(inputs[1])
+            comm = CommModel.hierarchical([procs // 2, procs // 4],
+                                          bandwidth=rng.uniform(0.2, 5, size=3),
+                                          latency=rng.uniform(0, 20, size=3))
+        contention = [None, None, 'link', 'bus'][int(rng.integers(4))]
+        reservations = free_at = None
+        if rng.random() < 0.3:
+            # existing load: short busy intervals on random processors
+            k = int(rng.integers(1, 50))
+            at = rng.uniform(0, 500, size=k)
+            reservations = list(zip(rng.integers(0, inputs[1], size=k).tolist(),
+                                    at.tolist(), (at + rng.uniform(0, 50, size=k)).tolist()))
+        elif rng.random() < 0.3:
+            # pool load: some processors busy from 0 until far after the DAG
+            # could finish on the others; admission's bound must still hold
+            free_at = np.where(rng.random(inputs[1]) < 0.5, 0, rng.exponential(2000, size=inputs[1]))
+            reservations = [(p, 0, t) for p, t in enumerate(free_at.tolist()) if t > 0]
+        bound = lower_bounds(inputs[2], inputs[3])['lower_bound']
+        if free_at is not None:
+            bound = max(bound, estimate(inputs[2], inputs[3], comm, free_at)[0])
+        for name, algorithm in ALGORITHMS.items():
+            random.seed(dag_seed)
+            options = {'comm': comm, 'reservations': reservations}
+            if name != 'HEFT-dup':  # duplication needs contention-free links
+                options['contention'] = contention
+            try:
+                schedule = algorithm(input_list=inputs, **options).schedule
+                errors = validate(schedule)
+                if schedule.makespan() < bound - 1e-6:
+                    errors.append('makespan {} below lower bound {}'.format(schedule.makespan(), bound))
+            except Exception as e:
+                errors = ['{}: {}'.format(type(e).__name__, e)]
+            if errors:
+                failures.append((dag_seed, name, errors))
+                if verbose:
+                    print('seed {} {}:'.format(dag_seed, name))
+                    for msg in errors[:10]:
+                        print('  ' + msg)
+    return failures
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    ap = ArgumentParser()
+    ap.add_argument('-n', '--iterations', type=int, default=1000,
+                    help="number of random DAGs")
+    ap.add_argument('-s', '--seed', type=int, default=0)
+    ap.add_argument('--max-tasks', type=int, default=60)
+    args = ap.parse_args()
+    failures = fuzz(args.iterations, args.seed, args.max_tasks, verbose=True)
+    print('{} DAGs x {} algorithms, {} infeasible schedules'.format(
+        args.iterations, len(ALGORITHMS), len(failures)))
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,81 @@
+# python gantt.py -i test.dot -o gantt.png
+
+import numpy as np
+
+
+def plot_gantt(schedule, ax=None, title=None, label_limit=200):
+    """
+    Draw a schedule as a Gantt chart, one lane per processor.
+
+    All task bars go into a single PolyCollection, so the cost is one draw
+    call regardless of the number of tasks. Duplicated task copies get a
+    second, hatched collection.
+
+    @param schedule: Schedule to draw
+    @param ax: matplotlib axes, a new figure is created if None
+    @param title: axes title
+    @param label_limit: write task ids on the bars only for schedules with
+                        at most this many tasks
+    @return: the axes
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(12, max(2, 0.3 * schedule.num_processors)))
+
+    ids, p, start, end = schedule.instances()
+    p = p.astype(float)
+    num_dups = len(schedule.dup_task)
+
+    # (n, 4, 2) rectangle corners: (start, p-h) (end, p-h) (end, p+h) (start, p+h)
+    h = 0.4
+    verts = np.empty((len(ids), 4, 2))
+    verts[:, [0, 3], 0] = start[:, None]
+    verts[:, [1, 2], 0] = end[:, None]
+    verts[:, [0, 1], 1] = (p - h)[:, None]
+    verts[:, [2, 3], 1] = (p + h)[:, None]
+
+    small = len(ids) <= label_limit
+    colors = plt.cm.tab20(np.asarray(p, dtype=int) % 20)
+    primary = len(ids) - num_dups
+    ax.add_collection(PolyCollection(verts[:primary], facecolors=colors[:primary],
+                                     edgecolors='k' if small else 'none',
+                                     linewidths=0.3))
+    if num_dups:
+        ax.add_collection(PolyCollection(verts[primary:], facecolors=colors[primary:],
+                                         edgecolors='k', linewidths=0.3, hatch='//'))
+    if small:
+        for t, x, y in zip(ids.tolist(), ((start + end) / 2).tolist(), p.tolist()):
+            ax.text(x, y, str(t), ha='center', va='center', fontsize=6)
+
+    makespan = float(end.max()) if len(ids) else 1.0
+    ax.set_xlim(0, makespan)
+    ax.set_ylim(-0.5, schedule.num_processors - 0.5)
+    if schedule.num_processors <= 64:
+        ax.set_yticks(range(schedule.num_processors))
+    ax.set_xlabel('time')
+    ax.set_ylabel('processor')
+    if title is not None:
+        ax.set_title(title)
+    return ax
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from heft import HEFT
+
+    ap = ArgumentParser()
+    ap.add_argument('-i', '--input', required=True,
+                    help="DAG description as a .dot file")
+    ap.add_argument('-o', '--output', default='gantt.png')
+    ap.add_argument('-p', type=int, default=4)
+    ap.add_argument('-b', type=float, default=0.1)
+    ap.add_argument('--ccr', type=float, default=0.1)
+    args = ap.parse_args()
+    new_sch = HEFT(file=args.input, p=args.p, b=args.b, ccr=args.ccr)
+    plot_gantt(new_sch.schedule, title='HEFT, makespan = {}'.format(new_sch.makespan))
+    plt.savefig(args.output, dpi=150, bbox_inches='tight')
@@ -1,20 +1,27 @@
 # python heft.py -i test.dot
 
-import operator
-from Processor import Processor
+import numpy as np
+import kernels
 from read_dag import read_dag
-from Task import Task
-import matplotlib.pyplot as plt
+from schedule import Schedule
+from topology import as_topology
 
 
 class HEFT:
-    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5):
+    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5, duplicate=False, comm=None, contention=None,
+                 reservations=None, availability=None, ranks=None):
         """ 
         @param file: 输入文件, 由 DAGGEN 生成
         @param verbose: boolean, 输出调试信息
         @param p: processor, 处理器个数
         @param b: 
         @param ccr: 
+        @param duplicate: boolean, 允许把关键前驱任务复制到空闲时段以减少通信延迟
+        @param comm: CommModel, 处理器间的带宽/延迟模型, 默认所有处理器对通信代价相同
+        @param contention: None, 'link' 或 'bus', 消息需要占用链路/总线的空闲时段
+        @param reservations: (proc, start, end) 列表, 处理器上已有的占用时段
+        @param availability: {proc: [(start, end), ...]}, 处理器的可用时间窗口
+        @param ranks: 预先算好的 rank (batch_rank.heft_ranks 的一行), 跳过 rank 计算
         """
         if input_list is None and file is not None:
             self.num_tasks, self.num_processors, comp_cost, self.graph = read_dag(
@@ -35,113 +42,80 @@ class HEFT:
             # for line in self.graph:
             #     print(line)
 
-        self.tasks = [Task(i) for i in range(self.num_tasks)]
-        self.processors = [Processor(i) for i in range(self.num_processors)]
+        self.duplicate = duplicate
+        self.topology = as_topology(self.graph)
+        self.schedule = Schedule(comp_cost, self.topology, comm, contention)
+        self.schedule.load_reservations(reservations, availability)
 
         # HEFT: compute cost and rank
-        for i in range(self.num_tasks):
-            self.tasks[i].comp_cost = comp_cost[i]
-            self.tasks[i].avg_comp = sum(comp_cost[i]) / self.num_processors
+        self.avg_comp = self.schedule.comp_cost.sum(axis=1) / self.num_processors
 
-        self.__computeRanks(self.tasks[0])
+        if ranks is None:
+            self.__computeRanks()
+        else:
+            self.schedule.rank[:] = ranks
 
         # if verbose:
         # for task in self.tasks:
         # print("Task ", task.id, "-> Rank: ", task.rank)
-        self.tasks.sort(key=lambda x: x.rank, reverse=True)
+        self.order = np.argsort(-self.schedule.rank, kind='stable')
 
         self.__allotProcessor()
-        self.makespan = max([t.duration['end'] for t in self.tasks])
+        self.makespan = self.schedule.makespan()
         self.utility = 10000
 
-    def __computeRanks(self, task):
-        # Assume that task[0] is the initial task, as generated by TGFF
-        # Assume communicate rate is equal between processors
-        curr_rank = 0
-        for succ in self.tasks:
-            if self.graph[task.id][succ.id] != -1:
-                if succ.rank is None:
-                    self.__computeRanks(succ)
-                curr_rank = max(
-                    curr_rank, self.graph[task.id][succ.id] + succ.rank)
-        task.rank = task.avg_comp + curr_rank
-
-    def __get_est(self, t, p):
-        est = 0
-        for pre in self.tasks:
-            # if pre also done on p, no communication cost
-            if self.graph[pre.id][t.id] != -1:
-                c = self.graph[pre.id][t.id] if pre.processor_id != p.id else 0
-                est = max(est, pre.duration['end'] + c)
-        free_times = []
-        if len(p.task_list) == 0:       # no task has yet been assigned to processor
-            free_times.append([0, float('inf')])
-        else:
-            for i in range(len(p.task_list)):
-                if i == 0:
-                    # if p is not busy from time 0
-                    if p.task_list[i].duration['start'] != 0:
-                        free_times.append(
-                            [0, p.task_list[i].duration['start']])
-                else:
-                    free_times.append(
-                        [p.task_list[i-1].duration['end'], p.task_list[i].duration['start']])
-            free_times.append([p.task_list[-1].duration['end'], float('inf')])
-        for slot in free_times:     # free_times is already sorted based on avaialbe start times
-            if est < slot[0] and slot[0] + t.comp_cost[p.id] <= slot[1]:
-                return slot[0]
-            if est >= slot[0] and est + t.comp_cost[p.id] <= slot[1]:
-                return est
+    @property
+    def tasks(self):
+        # Task views in rank order
+        return self.schedule.tasks(self.order)
+
+    @property
+    def processors(self):
+        return self.schedule.processors()
+
+    def __computeRanks(self):
+        # Upward rank in one reverse topological sweep, with the mean
+        # communication cost over processor pairs
+        kernels.upward_rank(self.topology, self.avg_comp,
+                            self.schedule.comm.mean_cost(self.topology.cost), self.schedule.rank)
 
     def __allotProcessor(self):
-        for t in self.tasks:
-            if t == self.tasks[0]:   # the one with highest rank
-                p, w = min(enumerate(t.comp_cost), key=operator.itemgetter(1))
-                t.processor_id = p
-                t.duration['start'] = 0
-                t.duration['end'] = w
-                self.processors[p].task_list.append(t)
-            else:
-                aft = float("inf")
-                for p in self.processors:
-                    est = self.__get_est(t, p)
-                    # print("Task: ", t.id, ", Proc: ", p.id, " -> EST: ", est)
-                    eft = est + t.comp_cost[p.id]
-                    if eft < aft:   # found better case of processor
-                        aft = eft
-                        best_p = p.id
-
-                t.processor_id = best_p
-                t.duration['start'] = aft - t.comp_cost[best_p]
-                t.duration['end'] = aft
-                self.processors[best_p].task_list.append(t)
-                self.processors[best_p].task_list.sort(
-                    key=lambda x: x.duration['start'])
+        for t in self.order:
+            est = self.schedule.earliest_starts(t)
+            eft = est + self.schedule.comp_cost[t]
+            dups = {}
+            if self.duplicate:
+                dups = self.__duplicationCandidates(t, eft)
+                for p, (dup_est, _, _) in dups.items():
+                    est[p] = dup_est
+                    eft[p] = dup_est + self.schedule.comp_cost[t][p]
+            best_p = int(np.argmin(eft))   # first processor with minimal EFT
+            if best_p in dups:
+                _, parent, parent_start = dups[best_p]
+                self.schedule.place_duplicate(parent, best_p, parent_start)
+            self.schedule.place(t, best_p, est[best_p])
+
+    def __duplicationCandidates(self, t, eft):
+        # processors on which copying t's critical parent lowers t's EFT
+        return {p: dup for p, dup in self.schedule.duplicate_starts(t).items()
+                if dup[0] + self.schedule.comp_cost[t][p] < eft[p]}
 
     def __str__(self):
-        print_str = ""
-        utility = 10000
-        for p in self.processors:
-            print_str += 'Processor {}:\n '.format(p.id)
-            for t in p.task_list:
-                print_str += 'Task {}: start = {}, end = {}\n'.format(
-                    t.id, t.duration['start'], t.duration['end'])
-                utility -= t.duration['end']
-        print_str += "Makespan = {}\n".format(self.makespan)
-        print_str += "Utility = {}\n".format(utility)
-        return print_str
+        lines = list(self.schedule.lines())
+        lines.append("Makespan = {}\n".format(self.makespan))
+        lines.append("Utility = {}\n".format(self.schedule.utility()))
+        return ''.join(lines)
 
     def getMakespan(self):
         return self.makespan
 
     def getUtility(self):
-        for p in self.processors:
-            for t in p.task_list:
-                self.utility -= t.duration['end']
+        self.utility = self.schedule.utility(offset=10000)
         return self.utility
 
 
 def solution():
+    import matplotlib.pyplot as plt
     # ./daggen -n 25 --fat 0.4 --density 0.4 --regular 0.2 --jump 2 --minalpha 20 --maxalpha 200 --dot -o ../task25.dot
     files = ['task20.dot', 'task21.dot', 'task22.dot', 'task23.dot', 'task24.dot', 'task25.dot',
              'task26.dot', 'task27.dot', 'task28.dot', 'task29.dot', 'task30.dot', 'task40.dot']
@@ -174,13 +148,6 @@ def solution():
 
 
 if __name__ == "__main__":
-    solution()
-    # from argparse import ArgumentParser
-    # ap = ArgumentParser()
-
-    # ap.add_argument('-i', '--input', required=True,
-    #                 help="DAG description as a .dot file")
-    # args = ap.parse_args()
-    # new_sch = HEFT(file=args.input, verbose=True, p=4, b=0.1, ccr=0.1)
-
-    # print(new_sch)
+    import sys
+    from cli import main
+    main(['schedule', '--algorithm', 'HEFT'] + sys.argv[1:])
@@ -0,0 +1,197 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# numpy: vectorized per task; numba: the loop kernels below, compiled;
+# python: the same kernels uncompiled, to check them without Numba
+BACKENDS = ('numpy', 'numba', 'python')
+backend = 'numba' if numba is not None else 'numpy'
+
+
+def use(name):
+    # select the backend of every scheduler in this process
+    global backend
+    if name not in BACKENDS:
+        raise ValueError('Unknown kernel backend {}'.format(name))
+    if name == 'numba' and numba is None:
+        raise ImportError('The numba backend needs Numba installed')
+    backend = name
+
+
+def __kernel(f):
+    # compiled on first call when Numba is installed; py_func is the plain
+    # function either way
+    if numba is None:
+        f.py_func = f
+        return f
+    return numba.njit(cache=True, nogil=True)(f)
+
+
+def __run(kernel, *args):
+    return (kernel if backend == 'numba' else kernel.py_func)(*args)
+
+
+@__kernel
+def _upward_rank(order, succ_ptr, dst, mean, weight, rank):
+    for i in range(len(order) - 1, -1, -1):
+        t = order[i]
+        best = 0.0
+        for e in range(succ_ptr[t], succ_ptr[t+1]):
+            value = mean[e] + rank[dst[e]]
+            if value > best:
+                best = value
+        rank[t] = weight[t] + best
+
+
+def upward_rank(topology, weight, mean, rank):
+    """
+    rank[t] = weight[t] + max(0, max over successors s of mean[e] + rank[s]),
+    in one reverse topological sweep, written into rank.
+
+    @param mean: mean communication cost of every edge, topology edge order
+    """
+    if backend != 'numpy':
+        return __run(_upward_rank, topology.order, topology.succ_ptr, topology.dst,
+                     np.asarray(mean, dtype=float), np.asarray(weight, dtype=float), rank)
+    for t in topology.order[::-1]:
+        lo, hi = topology.succ_ptr[t], topology.succ_ptr[t+1]
+        succ = topology.dst[lo:hi]
+        curr_rank = max(0, np.max(mean[lo:hi] + rank[succ])) if succ.size else 0
+        rank[t] = weight[t] + curr_rank
+
+
+@__kernel
+def _first_fit(starts, ends, i, ready, duration):
+    for j in range(i, len(starts)):
+        est = ready if ready >= ends[j-1] else ends[j-1]
+        if est + duration <= starts[j]:
+            return est
+    return np.nan
+
+
+def first_fit(starts, ends, i, ready, duration):
+    """
+    Start of the first gap ends[j-1]..starts[j], j >= i > 0, that fits
+    duration after ready, or None.
+
+    @param starts, ends: sorted busy intervals as arrays
+    """
+    if backend != 'numpy':
+        est = __run(_first_fit, starts, ends, i, float(ready), float(duration))
+        return None if np.isnan(est) else float(est)
+    est = np.maximum(ready, ends[i-1:-1])
+    fits = est + duration <= starts[i:]
+    j = int(np.argmax(fits))
+    return float(est[j]) if fits[j] else None
+
+
+@__kernel
+def _path_cost(order, succ_ptr, dst, cost, comp_cost, inv_bandwidth, latency,
+               critical, exit_id, use_critical, out):
+    # out[t, p] = max over successors s of reduce over pm of
+    # out[s, pm] + w(s, pm) + c(t, s, p, pm); reduce is max for PCT and min
+    # over pm, critical successors only (if any), for CNCT
+    P = comp_cost.shape[1]
+    for i in range(len(order) - 1, -1, -1):
+        t = order[i]
+        lo, hi = succ_ptr[t], succ_ptr[t+1]
+        if t == exit_id or lo == hi:
+            out[t, :] = 0
+            continue
+        only_critical = False
+        if use_critical:
+            for e in range(lo, hi):
+                if critical[dst[e]]:
+                    only_critical = True
+        for p in range(P):
+            best = -np.inf
+            for e in range(lo, hi):
+                s = dst[e]
+                if only_critical and not critical[s]:
+                    continue
+                value = -np.inf if not use_critical else np.inf
+                for pm in range(P):
+                    v = (out[s, pm] + comp_cost[s, pm]) + (cost[e] * inv_bandwidth[p, pm] + latency[p, pm])
+                    if use_critical:
+                        if v < value:
+                            value = v
+                    elif v > value:
+                        value = v
+                if value > best:
+                    best = value
+            out[t, p] = int(best)
+
+
+def __path_cost(topology, comp_cost, comm, out, critical=None):
+    use_critical = critical is not None
+    if critical is None:
+        critical = np.zeros(topology.num_tasks, dtype=np.bool_)
+    __run(_path_cost, topology.order, topology.succ_ptr, topology.dst, topology.cost,
+          comp_cost, comm.inv_bandwidth, comm.latency, critical,
+          topology.num_tasks - 1, use_critical, out)
+
+
+def __pairs(A, c, comm, reduce):
+    # (k, P): for each target processor p, reduce over source processors pm
+    # of A[:, pm] + message cost of c from p to pm (zero for pm == p), one
+    # (k, P) row block at a time, never a (k, P, P) table. Uniform costs
+    # only need the best (and for max the second best) value of each row,
+    # as in PEFT's OCT sweep.
+    P = A.shape[1]
+    if comm.is_uniform:
+        if reduce is np.minimum:
+            return np.minimum(A, A.min(axis=1, keepdims=True) + c[:, None])
+        if P == 1:
+            return A.copy()
+        best = A.argmax(axis=1)
+        rest = A.copy()
+        rest[np.arange(len(A)), best] = -np.inf
+        other = np.where(np.arange(P) == best[:, None], rest.max(axis=1, keepdims=True),
+                         A.max(axis=1, keepdims=True))
+        return np.maximum(A, other + c[:, None])
+    out = np.empty_like(A)
+    for p in range(P):
+        row = A + (c[:, None] * comm.inv_bandwidth[p] + comm.latency[p])
+        out[:, p] = row.max(axis=1) if reduce is np.maximum else row.min(axis=1)
+    return out
+
+
+def pct(topology, comp_cost, comm, PCT):
+    """
+    IPEFT's PCT into the integer array PCT:
+    PCT[t][p] = max over successors s, processors pm of
+                PCT[s][pm] + w(s, pm) + c(t, s) if p != pm
+    """
+    if backend != 'numpy':
+        return __path_cost(topology, comp_cost, comm, PCT)
+    exit_id = topology.num_tasks - 1
+    for t in topology.order[::-1]:
+        succ, c = topology.successors(t)
+        if t == exit_id or succ.size == 0:
+            PCT[t] = 0
+            continue
+        PCT[t] = np.max(__pairs(PCT[succ] + comp_cost[succ], c, comm, np.maximum), axis=0)
+
+
+def cnct(topology, comp_cost, comm, CN, CNCT):
+    """
+    IPEFT's CNCT into the integer array CNCT:
+    CNCT[t][p] = max over critical successors s (all successors if none is
+                 critical) of min over pm of
+                 CNCT[s][pm] + w(s, pm) + c(t, s) if p != pm
+    """
+    if backend != 'numpy':
+        return __path_cost(topology, comp_cost, comm, CNCT, np.asarray(CN, dtype=np.bool_))
+    exit_id = topology.num_tasks - 1
+    for t in topology.order[::-1]:
+        succ, c = topology.successors(t)
+        if t == exit_id or succ.size == 0:
+            CNCT[t] = 0
+            continue
+        cn = CN[succ]
+        if np.any(cn):
+            succ, c = succ[cn], c[cn]
+        CNCT[t] = np.max(__pairs(CNCT[succ] + comp_cost[succ], c, comm, np.minimum), axis=0)
@@ -1,45 +1,123 @@
 from heft import HEFT
 from randomHEFT import randomHEFT
 from ipeft import IPEFT
+from peft import PEFT
+from dls import DLS
 from read_dag import read_dag
+from corpus import open_corpus
+from bounds import lower_bounds, metrics
+from batch_rank import stack_inputs, heft_ranks, random_heft_ranks, ipeft_ranks, sample
+from replay import write_bundle
 
 from os import cpu_count
+from os.path import basename
 from itertools import product
-import pandas as pd
+from functools import partial
+from hashlib import blake2b
+import numpy as np
 import pickle
+import random
 import multiprocessing as mp
 from glob import glob
+import fnmatch
 import warnings
 import logging
+import traceback
 
 warnings.filterwarnings('ignore',category=RuntimeWarning)
-logging.basicConfig(filename="Error.log", level=logging.DEBUG)
 
-def solve(tuple_val):
+# algorithms evaluated by the sweep, result columns makespan_<name> and
+# slr_<name>, speedup_<name>, gap_<name> (see bounds.metrics)
+ALGORITHMS = {'HEFT': HEFT, 'prop': randomHEFT, 'IPEFT': IPEFT, 'PEFT': PEFT, 'DLS': DLS}
+
+# batched rankings of the algorithms that take precomputed ranks
+BATCH_RANKS = {'HEFT': heft_ranks, 'prop': random_heft_ranks, 'IPEFT': ipeft_ranks}
+
+# ccr / b / p grid evaluated for every DAG file
+GRID = {'ccr': [0.1, 0.25, 0.5, 0.8, 1, 2, 5, 8, 10, 15, 20, 25, 30],
+        'b': [0.1, 0.2, 0.5, 0.75, 1, 2],
+        'p': [4,8,16,32]}
+
+
+def case_key(filename, ccr, b, p, trial):
+    # identifies one sweep case independently of where the DAG files live
+    # (and of int / float columns after a round trip through pandas)
+    return '{}|{!r}|{!r}|{}|{}'.format(basename(filename), float(ccr), float(b), int(p), int(trial))
+
+
+def case_hash(key):
+    # stable across processes and hosts, unlike hash()
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+
+def in_shard(key, shard):
+    # shard = (i, N): the case belongs to shard i of N
+    return shard is None or case_hash(key) % shard[1] == shard[0]
+
+
+def solve(tuple_val, trials=None, shard=None, corpus=None, failures='failures'):
     idx,filename = tuple_val
+    # DAG files, or the DAGs of that name in a corpus archive
+    read = open_corpus(corpus).read_dag if corpus else read_dag
     print("Evaluating {}".format(idx))
-    val = filename.split('/')[1].split('.dot')[0].split('_')
-    ccr = [0.1, 0.25, 0.5, 0.8, 1, 2, 5, 8, 10, 15, 20, 25, 30]
-    b = [0.1, 0.2, 0.5, 0.75, 1, 2]
-    p = [4,8,16,32]
+    val = basename(filename).split('.dot')[0].split('_')
     param = dict(zip(keys, val))
+    param['file'] = basename(filename)
     result = []
-    for v2 in product(*[ccr, b, p]):
-        param.update(dict(zip(['ccr','b','p'], v2)))
+    # the cases of one processor count share the DAG and the cost shapes, so
+    # their ranks are computed together, one sweep per algorithm
+    for p in GRID['p']:
+        cases = []
+        for ccr, b, trial in product(GRID['ccr'], GRID['b'], range(trials or n_trials)):
+            key = case_key(filename, ccr, b, p, trial)
+            if not in_shard(key, shard):
+                continue
+            # costs drawn from a seed of the case, so any host reproduces it
+            seed = case_hash(key)
+            random.seed(seed)
+            np.random.seed(seed % 2**32)
+            case = dict(param, ccr=ccr, b=b, p=p, trial=trial)
+            try:
+                inputs = read(filename, p=p, b=b, ccr=ccr)
+            except:
+                logging.error("Error occured reading {}".format(key), exc_info=True)
+                continue
+            cases.append((case, inputs, random.getstate()))
+        if not cases:
+            continue
 
-        for _ in range(n_trials):
+        ranks = {}
+        try:
+            stacked = stack_inputs([inputs for _, inputs, _ in cases])
+            ranks = {name: batch(*stacked) for name, batch in BATCH_RANKS.items()}
+        except:
+            logging.error("Batched ranking failed, ranking every case alone", exc_info=True)
+
+        for k, (case, inputs, state) in enumerate(cases):
+            random.setstate(state)
+            name, options = 'lower_bounds', {}
             try:
-                inputs = read_dag(filename, p=param['p'], b=param['b'], ccr=param['ccr'])
-                param['makespan_HEFT'] = HEFT(input_list=inputs).makespan
-                param['makespan_prop'] = randomHEFT(input_list=inputs).makespan
-                param['makespan_IPEFT'] = IPEFT(input_list=inputs).makespan
-                result.append(param.copy())
+                bounds = lower_bounds(inputs[2], inputs[3])
+                case.update(('lb_' + key, v) for key, v in bounds.items())
+                for name, algorithm in ALGORITHMS.items():
+                    options = {'ranks': sample(ranks[name], k)} if name in ranks else {}
+                    state = random.getstate()
+                    makespan = algorithm(input_list=inputs, **options).makespan
+                    case['makespan_' + name] = makespan
+                    case.update((key + '_' + name, v) for key, v in metrics(makespan, inputs[2], bounds).items())
+                result.append(case)
             except:
-                logging.error("Error occured", exc_info=True)
-                msg = 'filename: {}, ccr: {}, b: {}, n_nodes: {}, p: {}\ncomp_matrix:\n{} adj_matrix:\n{}'.format(
-                    filename, param['ccr'], param['b'], inputs[0], inputs[1], inputs[2], inputs[3])
-                logging.info(msg)
-                print("Error! Info logged")
+                # one compact bundle per failure instead of the matrices in
+                # the log; python cli.py replay <bundle> re-runs it
+                key = case_key(filename, case['ccr'], case['b'], case['p'], case['trial'])
+                try:
+                    path = write_bundle(failures, key, case, inputs, name, state,
+                                        traceback.format_exc(), case_hash(key), options.get('ranks'))
+                except:
+                    path = None
+                    logging.error("Writing the replay bundle of {} failed".format(key), exc_info=True)
+                logging.error("{} failed in {}, replay bundle: {}".format(key, name, path))
+                print("Error! Replay bundle written to {}".format(path))
     
     return result
 
@@ -61,21 +139,128 @@ n_trials = 2
 
 keys = ['n', 'fat', 'density', 'regularity', 'jump']
 
-filenames = glob('dag/*.dot')
+columns = (['n', 'fat', 'density', 'regularity', 'jump', 'file', 'ccr','b','p', 'trial'] +
+           ['lb_critical_path', 'lb_work', 'lb_level', 'lb_lower_bound'] +
+           [k + '_' + name for name in ALGORITHMS for k in ('makespan', 'slr', 'speedup', 'gap')])
 
-pool = mp.Pool(cpu_count())
-print('Using {} cores'.format(cpu_count()))
 
-columns = ['n', 'fat', 'density', 'regularity', 'jump', 'ccr','b','p', 'makespan_HEFT', 'makespan_prop', 'makespan_IPEFT']
-data = []
-chunk_size = len(filenames)//10
-for i in range(10):
-    if i==9:
-        result_list = pool.map(solve, enumerate(filenames[i*chunk_size:]))
+def save(df, path):
+    # Parquet (columnar, for analysis.py) for .parquet paths, else pickle
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
     else:
-        result_list = pool.map(solve, enumerate(filenames[i*chunk_size:(i+1)*chunk_size]))
-    data.extend([result for sublist in result_list for result in sublist])
-    df = pd.DataFrame(data)
-    with open('data.pkl', 'wb') as handle:
-        pickle.dump(df, handle, protocol=pickle.HIGHEST_PROTOCOL)
-    print("Data saved!")
\ No newline at end of file
+        with open(path, 'wb') as handle:
+            pickle.dump(df, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(path):
+    if path.endswith('.parquet'):
+        import pandas as pd
+        return pd.read_parquet(path)
+    with open(path, 'rb') as handle:
+        return pickle.load(handle)
+
+
+def sweep(pattern='dag/*.dot', processes=None, trials=None, output=None, shard=None, corpus=None,
+          failures='failures'):
+    """
+    Run every algorithm over the ccr / b / p grid of every DAG file, saving
+    the rows as a DataFrame after each tenth of the files.
+
+    The pool is forked before pandas is imported, so workers only load
+    NumPy and the schedulers.
+
+    @param shard: (i, N) to run only the cases hashed to shard i of N, so
+                  N hosts can split the sweep without coordination; merge
+                  their outputs with merge()
+    @param corpus: corpus archive (see corpus.py) to take the DAGs from
+                   instead of .dot files; pattern then filters its names
+    @param output: default data.pkl, or data.shard-i-of-N.pkl for a shard;
+                   a .parquet name writes Parquet
+    @param failures: directory of the replay bundles of failed cases (see
+                     replay.py); Error.log only gets one line per failure
+    """
+    logging.basicConfig(filename="Error.log", level=logging.DEBUG)
+    if corpus:
+        filenames = sorted(fnmatch.filter(open_corpus(corpus).names, basename(pattern)))
+    else:
+        filenames = sorted(glob(pattern))
+    trials = trials or n_trials
+    if output is None:
+        output = 'data.pkl' if shard is None else 'data.shard-{}-of-{}.pkl'.format(*shard)
+    processes = processes or cpu_count()
+    pool = mp.Pool(processes)
+    print('Using {} cores'.format(processes))
+    import pandas as pd
+
+    data = []
+    chunk_size = len(filenames)//10
+    work = partial(solve, trials=trials, shard=shard, corpus=corpus, failures=failures)
+    for i in range(10):
+        if i==9:
+            result_list = pool.map(work, enumerate(filenames[i*chunk_size:]))
+        else:
+            result_list = pool.map(work, enumerate(filenames[i*chunk_size:(i+1)*chunk_size]))
+        data.extend([result for sublist in result_list for result in sublist])
+        df = pd.DataFrame(data)
+        # what this output covers, for the completeness check of merge()
+        df.attrs.update(files=[basename(f) for f in filenames], trials=trials,
+                        grid=GRID, shard=shard, complete=i == 9)
+        save(df, output)
+        print("Data saved!")
+    pool.close()
+    return df
+
+
+def merge(paths, output='data.pkl'):
+    """
+    Combine the outputs of sweep shards into one DataFrame.
+
+    Checks that the shards come from the same sweep, that every shard
+    0..N-1 is present and finished, and lists the cases missing from the
+    result (failed ones, see the replay bundles on their host). Duplicated cases,
+    e.g. from a shard run twice, are kept once.
+
+    @return: (DataFrame, list of missing case keys)
+    """
+    import pandas as pd
+    frames = []
+    for path in sorted(paths):
+        frames.append(load(path))
+    if not frames:
+        raise ValueError('No shards to merge')
+
+    first = frames[0].attrs
+    shards = set()
+    for path, df in zip(sorted(paths), frames):
+        meta = df.attrs
+        for k in ('files', 'trials', 'grid'):
+            if meta.get(k) != first.get(k):
+                raise ValueError('{} is from a different sweep ({} differs)'.format(path, k))
+        if not meta.get('complete'):
+            raise ValueError('{} is from an unfinished shard'.format(path))
+        shard = meta.get('shard') or (0, 1)
+        if shards and shard[1] != next(iter(shards))[1]:
+            raise ValueError('{} uses a different number of shards'.format(path))
+        shards.add(tuple(shard))
+    count = next(iter(shards))[1]
+    absent = sorted(set(range(count)) - {i for i, _ in shards})
+    if absent:
+        raise ValueError('Missing shards {} of {}'.format(absent, count))
+
+    rows = [f for f in frames if len(f)]
+    # shards that ran no case at all still make a (fully missing) result
+    df = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=columns)
+    if len(df):
+        df = df.drop_duplicates(subset=['file', 'ccr', 'b', 'p', 'trial'], ignore_index=True)
+    done = set(map(case_key, df['file'], df['ccr'], df['b'], df['p'], df['trial'])) if len(df) else set()
+    expected = (case_key(f, *v, t) for f in first['files']
+                for v in product(*first['grid'].values()) for t in range(first['trials']))
+    missing = [key for key in expected if key not in done]
+    df.attrs = dict(first, shard=None, missing=missing)
+    save(df, output)
+    return df, missing
+
+
+if __name__ == "__main__":
+    sweep()
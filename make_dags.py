@@ -1,4 +1,5 @@
-from os import system
+import os
+import subprocess
 from itertools import product
 
 minalpha = 20
@@ -12,21 +13,42 @@ jump = [1, 2, 4]
 keys = ['n', 'fat', 'density', 'regularity', 'jump']
 values = [n, fat, density, regularity, jump]
 
-for v in product(*values):
-    param = dict(zip(keys, v))
-    filename = 'generator/{}_{}_{}_{}_{}.dot'.format(param['n'],
-                                                     param['fat'],
-                                                     param['density'],
-                                                     param['regularity'],
-                                                     param['jump'])
-    param = dict(zip(keys, v))
-    system("./generator/daggen -n {} --fat {} --density {} --regular {} --jump {} --minalpha {} --maxalpha {} --dot -o {} >/dev/null 2>&1".format(
-        param['n'],
-        param['fat'],
-        param['density'],
-        param['regularity'],
-        param['jump'],
-        minalpha,
-        maxalpha,
-        filename
-    ))
+
+def generate(values=values, out_dir='generator', daggen='./generator/daggen',
+             minalpha=minalpha, maxalpha=maxalpha):
+    """
+    One daggen DAG per point of the grid, named n_fat_density_regularity_jump.dot.
+
+    @return: (files written, daggen error messages)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written, errors = [], []
+    for v in product(*values):
+        param = dict(zip(keys, v))
+        filename = '{}/{}_{}_{}_{}_{}.dot'.format(out_dir,
+                                                  param['n'],
+                                                  param['fat'],
+                                                  param['density'],
+                                                  param['regularity'],
+                                                  param['jump'])
+        command = [daggen, '-n', str(param['n']), '--fat', str(param['fat']),
+                   '--density', str(param['density']), '--regular', str(param['regularity']),
+                   '--jump', str(param['jump']), '--minalpha', str(minalpha),
+                   '--maxalpha', str(maxalpha), '--dot', '-o', filename]
+        try:
+            done = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        except OSError as e:
+            # daggen missing or not executable: every call would fail
+            errors.append('{}: {}'.format(daggen, e))
+            break
+        if done.returncode == 0 and os.path.exists(filename):
+            written.append(filename)
+        else:
+            message = done.stderr.strip().splitlines()
+            errors.append('{}: {}'.format(filename, message[0] if message else
+                                          'exit status {}'.format(done.returncode)))
+    return written, errors
+
+
+if __name__ == "__main__":
+    generate()
@@ -0,0 +1,243 @@
+# python multilevel.py -n 20000 -p 8 --ratio 0.1
+
+import time
+import numpy as np
+from heft import HEFT
+from read_dag import read_dag
+from refine import LocalSearch
+from schedule import Schedule
+from topology import Topology, as_topology
+
+
+def coarsen_once(topology, comp_cost, target):
+    """
+    One level of linear clustering: a matching of DAG edges is contracted,
+    cheapest combined work first (tiny tasks and chains go first), heaviest
+    communication first among equals.
+
+    Only edges u -> v where u has no other successor or v has no other
+    predecessor are contracted. A path can then never leave and re-enter a
+    cluster, so any matching of such edges keeps the graph acyclic.
+
+    @param target: stop once the graph is down to this many tasks
+    @return: (cluster_of, coarse topology, coarse comp_cost), cluster_of
+             mapping each task to its super-task
+    """
+    n = topology.num_tasks
+    src, dst, cost = topology.src, topology.dst, topology.cost
+    outdeg = np.diff(topology.succ_ptr)
+    indeg = np.diff(topology.pred_ptr)
+    work = comp_cost.mean(axis=1)
+
+    cand = np.flatnonzero((outdeg[src] == 1) | (indeg[dst] == 1))
+    cand = cand[np.lexsort((-cost[cand], work[src[cand]] + work[dst[cand]]))]
+    leader = np.arange(n)
+    matched = [False] * n
+    merges = n - target
+    for u, v in zip(src[cand].tolist(), dst[cand].tolist()):
+        if merges <= 0:
+            break
+        if not (matched[u] or matched[v]):
+            matched[u] = matched[v] = True
+            leader[u] = leader[v] = min(u, v)
+            merges -= 1
+
+    _, cluster_of = np.unique(leader, return_inverse=True)
+    num_clusters = int(cluster_of.max()) + 1 if n else 0
+    coarse_cost = np.zeros((num_clusters, comp_cost.shape[1]))
+    np.add.at(coarse_cost, cluster_of, comp_cost)
+
+    # internal edges vanish, parallel edges keep the largest message
+    cs, cd = cluster_of[src], cluster_of[dst]
+    keep = cs != cd
+    cs, cd, c = cs[keep], cd[keep], cost[keep]
+    key = cs * num_clusters + cd
+    order = np.argsort(key, kind='stable')
+    key, c = key[order], c[order]
+    first = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if key.size else np.zeros(0, dtype=np.int64)
+    c = np.maximum.reduceat(c, first) if key.size else c
+    cs, cd = key[first] // num_clusters, key[first] % num_clusters
+
+    # number super-tasks in topological order, as read_dag numbers tasks;
+    # IPEFT's ranking relies on it
+    relabel = np.empty(num_clusters, dtype=np.int64)
+    relabel[Topology(num_clusters, cs, cd, c).order] = np.arange(num_clusters)
+    coarse_cost[relabel] = coarse_cost.copy()
+    coarse = Topology(num_clusters, relabel[cs], relabel[cd], c)
+    return relabel[cluster_of], coarse, coarse_cost
+
+
+def coarsen(topology, comp_cost, ratio=0.25, max_levels=30, min_shrink=0.05):
+    """
+    Coarsen a task graph level by level until it has at most ratio * num_tasks
+    super-tasks, or a level removes less than min_shrink of the tasks (few
+    contractible edges are left).
+
+    @return: list of (cluster_of, topology, comp_cost), finest level first;
+             entry 0 has cluster_of None
+    """
+    comp_cost = np.asarray(comp_cost, dtype=float)
+    target = max(1, int(np.ceil(ratio * topology.num_tasks)))
+    levels = [(None, topology, comp_cost)]
+    while len(levels) <= max_levels and topology.num_tasks > target:
+        cluster_of, topology, comp_cost = coarsen_once(topology, comp_cost, target)
+        if topology.num_tasks == levels[-1][1].num_tasks:
+            break
+        levels.append((cluster_of, topology, comp_cost))
+        if topology.num_tasks > (1 - min_shrink) * levels[-2][1].num_tasks:
+            break
+    return levels
+
+
+def project(coarse, cluster_of, topology, comp_cost, refine_ms=0, seed=None):
+    """
+    Project a schedule of super-tasks onto their members.
+
+    Members run back to back on their super-task's processor, in topological
+    order, which gives a valid processor order; the tasks are then re-timed
+    as early as that order and the finer communication costs allow.
+
+    @param refine_ms: local-search budget at this level, 0 for none
+    """
+    n = topology.num_tasks
+    topo_pos = np.empty(n, dtype=np.int64)
+    topo_pos[topology.order] = np.arange(n)
+    proc = coarse.proc_id[cluster_of]
+    w = comp_cost[np.arange(n), proc]
+
+    # offset of each member within its super-task
+    members = np.lexsort((topo_pos, cluster_of))
+    done = np.cumsum(w[members]) - w[members]
+    first = np.r_[True, cluster_of[members[1:]] != cluster_of[members[:-1]]]
+    offset = np.empty(n)
+    offset[members] = done - np.maximum.accumulate(np.where(first, done, 0))
+
+    schedule = Schedule(comp_cost, topology, coarse.comm)
+    schedule.proc_id[:] = proc
+    schedule.start[:] = coarse.start[cluster_of] + offset
+    schedule.end[:] = schedule.start + w
+    schedule.rank[:] = coarse.rank[cluster_of]
+    search = LocalSearch(schedule, seed)
+    if refine_ms:
+        search.improve(refine_ms)
+    return search.to_schedule()
+
+
+class Multilevel:
+    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5,
+                 ratio=0.25, algorithm=HEFT, refine_ms=0, seed=None, comm=None):
+        """
+        Multilevel scheduling: coarsen the DAG, schedule the coarse graph,
+        project the schedule back level by level.
+
+        @param ratio: target size of the coarsest graph, as a fraction of the
+                      number of tasks
+        @param algorithm: scheduler class for the coarsest graph (HEFT, IPEFT, ...)
+        @param refine_ms: local-search budget per level while projecting
+        @param seed: seed of the local search
+        @param comm: CommModel, uniform if None
+        """
+        if input_list is None and file is not None:
+            self.num_tasks, self.num_processors, comp_cost, self.graph = read_dag(
+                file, p, b, ccr)
+        elif len(input_list) == 4 and file is None:
+            self.num_tasks, self.num_processors, comp_cost, self.graph = input_list
+        else:
+            print('Enter filename or input params')
+            raise Exception()
+
+        started = time.perf_counter()
+        self.topology = as_topology(self.graph)
+        self.levels = coarsen(self.topology, comp_cost, ratio)
+        coarsened = time.perf_counter()
+
+        _, topology, cost = self.levels[-1]
+        schedule = algorithm(input_list=[topology.num_tasks, self.num_processors,
+                                         cost, topology], comm=comm).schedule
+        scheduled = time.perf_counter()
+
+        for i in range(len(self.levels) - 1, 0, -1):
+            _, topology, cost = self.levels[i-1]
+            schedule = project(schedule, self.levels[i][0], topology, cost, refine_ms, seed)
+        self.schedule = schedule
+        self.makespan = self.schedule.makespan()
+        self.order = np.argsort(-self.schedule.rank, kind='stable')
+        self.timings = {'coarsen': coarsened - started,
+                        'schedule': scheduled - coarsened,
+                        'project': time.perf_counter() - scheduled}
+
+        if verbose:
+            print("Levels: ", [level[1].num_tasks for level in self.levels])
+            print("Timings: ", self.timings)
+
+    @property
+    def tasks(self):
+        # Task views in rank order
+        return self.schedule.tasks(self.order)
+
+    @property
+    def processors(self):
+        return self.schedule.processors()
+
+    def __str__(self):
+        lines = list(self.schedule.lines())
+        lines.append("Makespan = {}\n".format(self.makespan))
+        return ''.join(lines)
+
+    def getMakespan(self):
+        return self.makespan
+
+
+def compare(input_list, ratio=0.25, algorithm=HEFT, refine_ms=0, comm=None):
+    """
+    Run flat and multilevel scheduling on the same DAG.
+
+    @return: dict with both run times and makespans, the speedup of the
+             multilevel run and its relative makespan loss
+    """
+    started = time.perf_counter()
+    flat = algorithm(input_list=input_list, comm=comm)
+    flat_time = time.perf_counter() - started
+    started = time.perf_counter()
+    multi = Multilevel(input_list=input_list, ratio=ratio, algorithm=algorithm,
+                       refine_ms=refine_ms, comm=comm)
+    multi_time = time.perf_counter() - started
+    return {'flat_time': flat_time, 'multilevel_time': multi_time,
+            'speedup': flat_time / multi_time,
+            'flat_makespan': flat.makespan, 'multilevel_makespan': multi.makespan,
+            'makespan_loss': multi.makespan / flat.makespan - 1,
+            'levels': [level[1].num_tasks for level in multi.levels]}
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from ipeft import IPEFT
+    from read_dag import random_dag
+
+    ap = ArgumentParser()
+    ap.add_argument('-i', '--input', help="DAG description as a .dot file")
+    ap.add_argument('-n', type=int, default=20000,
+                    help="number of tasks of a random DAG, if no input is given")
+    ap.add_argument('-p', type=int, default=8)
+    ap.add_argument('-b', type=float, default=0.5)
+    ap.add_argument('--ccr', type=float, default=0.5)
+    ap.add_argument('--density', type=float, default=None,
+                    help="edge density of the random DAG, default 3 / n")
+    ap.add_argument('--ratio', type=float, default=0.25)
+    ap.add_argument('--algorithm', choices=['HEFT', 'IPEFT'], default='HEFT')
+    ap.add_argument('--refine-ms', type=float, default=0)
+    args = ap.parse_args()
+
+    if args.input:
+        inputs = read_dag(args.input, args.p, args.b, args.ccr)
+    else:
+        density = args.density if args.density is not None else 3 / args.n
+        inputs = random_dag(args.n, args.p, args.b, args.ccr, density, seed=0, sparse=True)
+    result = compare(inputs, args.ratio, {'HEFT': HEFT, 'IPEFT': IPEFT}[args.algorithm],
+                     args.refine_ms)
+    print('levels: {}'.format(result['levels']))
+    print('flat: {:.2f}s makespan {:.1f}'.format(result['flat_time'], result['flat_makespan']))
+    print('multilevel: {:.2f}s makespan {:.1f}'.format(result['multilevel_time'],
+                                                        result['multilevel_makespan']))
+    print('speedup {:.2f}x, makespan loss {:+.2%}'.format(result['speedup'],
+                                                          result['makespan_loss']))
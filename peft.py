@@ -0,0 +1,115 @@
+from read_dag import read_dag
+import heapq
+import numpy as np
+from schedule import Schedule
+from topology import as_topology, edge_range
+
+
+class PEFT:
+    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5, comm=None, contention=None,
+                 reservations=None, availability=None):
+        """
+        Predict Earliest Finish Time (Arabnejad & Barbosa, 2014).
+
+        Tasks are ranked by their average Optimistic Cost Table entry and each
+        task goes to the processor minimizing EFT + OCT, i.e. its finish time
+        plus an optimistic estimate of the remaining path to the exit.
+        """
+        if input_list is None and file is not None:
+            self.num_tasks, self.num_processors, comp_cost, self.graph = read_dag(
+                file, p, b, ccr)
+        elif len(input_list) == 4 and file is None:
+            self.num_tasks, self.num_processors, comp_cost, self.graph = input_list
+        else:
+            print('Enter filename or input params')
+            raise Exception()
+
+        if verbose:
+            print("No. of Tasks: ", self.num_tasks)
+            print("No. of processors: ", self.num_processors)
+
+        self.topology = as_topology(self.graph)
+        self.schedule = Schedule(comp_cost, self.topology, comm, contention)
+        self.schedule.load_reservations(reservations, availability)
+        self.comp_cost = self.schedule.comp_cost
+
+        self.__computeOCT()
+        self.schedule.rank[:] = self.OCT.sum(axis=1) / self.num_processors
+
+        if verbose:
+            print('OCT:\n', self.OCT)
+
+        self.__allotProcessor()
+        self.makespan = self.schedule.makespan()
+
+    @property
+    def tasks(self):
+        # Task views in scheduling order
+        return self.schedule.tasks(self.order)
+
+    @property
+    def processors(self):
+        return self.schedule.processors()
+
+    def __computeOCT(self):
+        # OCT[t][p] = max over successors s of min over pm of
+        #             OCT[s][pm] + w(s, pm) + c(t, s) if p != pm
+        # Levels are processed from the exit upwards, each one as a batch of
+        # edges. With uniform communication the inner min per edge is
+        # min(A[p], min(A) + c) with A = OCT[s] + w(s), so no (P x P) table
+        # is built; otherwise it is taken one source processor at a time.
+        topo = self.topology
+        comm = self.schedule.comm
+        self.OCT = np.zeros((self.num_tasks, self.num_processors))
+        has_succ = np.diff(topo.succ_ptr) > 0
+        for tasks in reversed(topo.levels):
+            tasks = tasks[has_succ[tasks]]
+            if tasks.size == 0:
+                continue
+            edges = edge_range(topo.succ_ptr, tasks)
+            cost = self.OCT[topo.dst[edges]] + self.comp_cost[topo.dst[edges]]
+            if comm.is_uniform:
+                edge_oct = np.minimum(cost, cost.min(axis=1, keepdims=True) +
+                                      topo.cost[edges, None])
+            else:
+                data = topo.cost[edges, None]
+                edge_oct = np.empty_like(cost)
+                for p in range(self.num_processors):
+                    edge_oct[:, p] = np.min(cost + data * comm.inv_bandwidth[p] +
+                                            comm.latency[p], axis=1)
+            counts = topo.succ_ptr[tasks + 1] - topo.succ_ptr[tasks]
+            offsets = np.cumsum(counts) - counts
+            self.OCT[tasks] = np.maximum.reduceat(edge_oct, offsets, axis=0)
+
+    def __allotProcessor(self):
+        # ready list keyed by rank_oct; successors are released once all
+        # their predecessors are placed
+        rank = self.schedule.rank
+        topo = self.topology
+        indeg = np.diff(topo.pred_ptr)
+        ready = [(-rank[t], t) for t in np.flatnonzero(indeg == 0).tolist()]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, t = heapq.heappop(ready)
+            order.append(t)
+            est = self.schedule.earliest_starts(t)
+            eft = est + self.comp_cost[t]
+            best_p = int(np.argmin(eft + self.OCT[t]))
+            self.schedule.place(t, best_p, est[best_p])
+            for s in topo.successors(t)[0].tolist():
+                indeg[s] -= 1
+                if indeg[s] == 0:
+                    heapq.heappush(ready, (-rank[s], s))
+        self.order = np.array(order, dtype=np.int64)
+
+    def __str__(self):
+        lines = list(self.schedule.lines(proc_offset=1, task_offset=1))
+        lines.append("Makespan = {}\n".format(self.makespan))
+        return ''.join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+    main(['schedule', '--algorithm', 'PEFT'] + sys.argv[1:])
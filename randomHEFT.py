@@ -1,13 +1,18 @@
 from read_dag import read_dag
-import operator
 from random import uniform
 import numpy
-from Processor import Processor
-from Task import Task
+import kernels
+from schedule import Schedule
+from topology import as_topology
 
 
 class randomHEFT:
-    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5):
+    def __init__(self, input_list=None, file=None, verbose=False, p=3, b=0.5, ccr=0.5, comm=None, contention=None,
+                 reservations=None, availability=None, ranks=None):
+        """
+        @param ranks: precomputed ranks (a row of batch_rank.random_heft_ranks),
+                      skips the ranking
+        """
         if input_list is None and file is not None:
             self.num_tasks, self.num_processors, comp_cost, self.graph = read_dag(
                 file, p, b, ccr)
@@ -27,139 +32,78 @@ class randomHEFT:
             for line in self.graph:
                 print(line)
 
-        self.tasks = [Task(i) for i in range(self.num_tasks)]
-        self.processors = [Processor(i) for i in range(self.num_processors)]
+        self.topology = as_topology(self.graph)
+        self.schedule = Schedule(comp_cost, self.topology, comm, contention)
+        self.schedule.load_reservations(reservations, availability)
 
-        for i in range(self.num_tasks):
-            self.tasks[i].comp_cost = comp_cost[i]
-            ################## PROPOSED CHANGE ########################
-            highest_w = max(comp_cost[i])
-            lowest_w = min(comp_cost[i])
-            if highest_w == 0:
-                self.tasks[i].weight = 0
-            else:
-                self.tasks[i].weight = (
-                    highest_w - lowest_w)/(highest_w/lowest_w)
-            ###########################################################
+        ################## PROPOSED CHANGE ########################
+        highest_w = self.schedule.comp_cost.max(axis=1)
+        lowest_w = self.schedule.comp_cost.min(axis=1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            self.weight = numpy.where(
+                highest_w == 0, 0, (highest_w - lowest_w)/(highest_w/lowest_w))
+        ###########################################################
 
-        self.__computeRanks(self.tasks[0])
-        self.tasks.sort(key=lambda x: x.rank, reverse=True)
+        if ranks is None:
+            self.__computeRanks()
+        else:
+            self.schedule.rank[:] = ranks
+        self.order = numpy.argsort(-self.schedule.rank, kind='stable')
 
         if verbose:
-            for task in self.tasks:
-                print("Task ", task.id+1, "-> Rank: ", task.rank)
+            for t in self.order:
+                print("Task ", t+1, "-> Rank: ", self.schedule.rank[t])
 
         self.__allotProcessor()
-        self.makespan = max([t.duration['end'] for t in self.tasks])
-
-    def __computeRanks(self, task):
-        # Assume that task[0] is the initial task, as generated by TGFF
-        # Assume communicate rate is equal between processors
-        curr_rank = 0
-        for succ in self.tasks:
-            if self.graph[task.id][succ.id] != -1:
-                if succ.rank is None:
-                    self.__computeRanks(succ)
-                curr_rank = max(
-                    curr_rank, self.graph[task.id][succ.id] + succ.rank)
-        task.rank = task.weight + curr_rank
-
-    def __get_est(self, t, p):
-        est = 0
-        for pre in self.tasks:
-            # if pre also done on p, no communication cost
-            if self.graph[pre.id][t.id] != -1:
-                c = self.graph[pre.id][t.id] if pre.processor_id != p.id else 0
-                est = max(est, pre.duration['end'] + c)
-        free_times = []
-        if len(p.task_list) == 0:       # no task has yet been assigned to processor
-            free_times.append([0, float('inf')])
-        else:
-            for i in range(len(p.task_list)):
-                if i == 0:
-                    # if p is not busy from time 0
-                    if p.task_list[i].duration['start'] != 0:
-                        free_times.append(
-                            [0, p.task_list[i].duration['start']])
-                else:
-                    free_times.append(
-                        [p.task_list[i-1].duration['end'], p.task_list[i].duration['start']])
-            free_times.append([p.task_list[-1].duration['end'], float('inf')])
-        for slot in free_times:     # free_times is already sorted based on avaialbe start times
-            if est < slot[0] and slot[0] + t.comp_cost[p.id] <= slot[1]:
-                return slot[0]
-            if est >= slot[0] and est + t.comp_cost[p.id] <= slot[1]:
-                return est
+        self.makespan = self.schedule.makespan()
+
+    @property
+    def tasks(self):
+        # Task views in rank order
+        return self.schedule.tasks(self.order)
+
+    @property
+    def processors(self):
+        return self.schedule.processors()
+
+    def __computeRanks(self):
+        # Upward rank in one reverse topological sweep, with the mean
+        # communication cost over processor pairs
+        kernels.upward_rank(self.topology, self.weight,
+                            self.schedule.comm.mean_cost(self.topology.cost), self.schedule.rank)
 
     def __allotProcessor(self):
-        for t in self.tasks:
-            if t == self.tasks[0]:   # the one with highest rank
-                p, w = min(enumerate(t.comp_cost), key=operator.itemgetter(1))
-                t.processor_id = p
-                t.duration['start'] = 0
-                t.duration['end'] = w
-                self.processors[p].task_list.append(t)
+        for t in self.order:
+            w = self.schedule.comp_cost[t]
+            est = self.schedule.earliest_starts(t)
+            eft = est + w
+            best_p = int(numpy.argmin(eft))
+            best_eft = eft[best_p]
+
+            ########################### PROPOSED CHANGE #########################
+            fastest_p = int(numpy.argmin(w))
+            fastest_eft = eft[fastest_p]
+            if fastest_p == best_p or fastest_eft == best_eft:     # local min == global min
+                p = best_p
             else:
-                best_eft = float("inf")
-                for p in self.processors:
-                    est = self.__get_est(t, p)
-                    # print("Task: ", t.id, ", Proc: ", p.id, " -> EST: ", est)
-                    eft = est + t.comp_cost[p.id]
-                    if eft < best_eft:   # found better case of processor
-                        best_eft = eft
-                        best_p = p.id
-
-                ########################### PROPOSED CHANGE #########################
-                fastest_p, fastest_w = min(
-                    enumerate(t.comp_cost), key=operator.itemgetter(1))
-                fastest_eft = self.__get_est(
-                    t, self.processors[fastest_p]) + fastest_w
-                if fastest_p == best_p or fastest_eft == best_eft:     # local min == global min
-                    t.processor_id = best_p
-                    t.duration['start'] = best_eft - t.comp_cost[best_p]
-                    t.duration['end'] = best_eft
-                    self.processors[best_p].task_list.append(t)
-                    self.processors[best_p].task_list.sort(
-                        key=lambda x: x.duration['start'])
+                w_abstract = (fastest_eft - best_eft) / \
+                    (fastest_eft/best_eft)
+                cross_thresh = self.weight[t] / w_abstract
+                # do cross-over for global minima
+                if cross_thresh <= uniform(0.1, 0.3):
+                    p = best_p
                 else:
-
-                    w_abstract = (fastest_eft - best_eft) / \
-                        (fastest_eft/best_eft)
-                    cross_thresh = t.weight / w_abstract
-                    # do cross-over for global minima
-                    if cross_thresh <= uniform(0.1, 0.3):
-                        t.processor_id = best_p
-                        t.duration['start'] = best_eft - t.comp_cost[best_p]
-                        t.duration['end'] = best_eft
-                        self.processors[best_p].task_list.append(t)
-                        self.processors[best_p].task_list.sort(
-                            key=lambda x: x.duration['start'])
-                    else:
-                        t.processor_id = fastest_p
-                        t.duration['start'] = fastest_eft - \
-                            t.comp_cost[fastest_p]
-                        t.duration['end'] = fastest_eft
-                        self.processors[fastest_p].task_list.append(t)
-                        self.processors[fastest_p].task_list.sort(
-                            key=lambda x: x.duration['start'])
-                #####################################################################
+                    p = fastest_p
+            self.schedule.place(t, p, est[p])
+            #####################################################################
 
     def __str__(self):
-        print_str = ""
-        for p in self.processors:
-            print_str += 'Processor {}:\n '.format(p.id)
-            for t in p.task_list:
-                print_str += 'Task {}: start = {}, end = {}\n'.format(
-                    t.id+1, t.duration['start'], t.duration['end'])
-        print_str += "Makespan = {}\n".format(self.makespan)
-        return print_str
+        lines = list(self.schedule.lines(proc_offset=0, task_offset=1))
+        lines.append("Makespan = {}\n".format(self.makespan))
+        return ''.join(lines)
 
 
 if __name__ == "__main__":
-    from argparse import ArgumentParser
-    ap = ArgumentParser()
-    ap.add_argument('-i', '--input', required=True,
-                    help="DAG description as a .dot file")
-    args = ap.parse_args()
-    new_sch = randomHEFT(file=args.input, verbose=True, p=4, b=0.1, ccr=0.1)
-    print(new_sch)
+    import sys
+    from cli import main
+    main(['schedule', '--algorithm', 'randomHEFT'] + sys.argv[1:])
@@ -0,0 +1,165 @@
+import numpy as np
+from topology import edge_range
+
+# bound on the temporary (edges x row width) block of one sweep step
+CHUNK_WORDS = 1 << 24
+
+
+class Reachability:
+    """
+    Reachability index of a task DAG: which tasks are (strict) descendants
+    of which, answered in O(1) per pair.
+
+    Two representations, both filled in one reverse topological sweep, a
+    level at a time, each task combining the rows of its successors:
+      - 'bitset': one packed uint64 row of descendant bits per task,
+        N * N / 8 bytes;
+      - 'chain': the DAG is covered by chains (paths); per task and chain
+        the first position on the chain it reaches, N * K * 4 bytes for K
+        chains. Much smaller for graphs made of long chains.
+    By default the smaller of the two is used.
+
+    level is the longest edge count from an entry, height the longest edge
+    count to an exit.
+    """
+
+    def __init__(self, topology, method=None):
+        """
+        @param topology: Topology of the task graph
+        @param method: 'bitset', 'chain' or None to pick the smaller one
+        """
+        self.topology = topology
+        self.num_tasks = n = topology.num_tasks
+        self.level = topology.level
+        self.height = self.__heights()
+
+        if method is None:
+            self.__chain_cover()
+            method = 'chain' if self.num_chains * 4 < 8 * ((n + 63) // 64) else 'bitset'
+        self.method = method
+        if method == 'bitset':
+            self.__build_bitset()
+        elif method == 'chain':
+            if not hasattr(self, 'chain'):
+                self.__chain_cover()
+            self.__build_chain()
+        else:
+            raise ValueError('Unknown reachability method {}'.format(method))
+
+    def __heights(self):
+        topo = self.topology
+        height = np.zeros(self.num_tasks, dtype=np.int64)
+        for tasks in reversed(topo.levels):
+            counts = topo.succ_ptr[tasks + 1] - topo.succ_ptr[tasks]
+            tasks = tasks[counts > 0]
+            if tasks.size:
+                counts = counts[counts > 0]
+                succ = topo.dst[edge_range(topo.succ_ptr, tasks)]
+                height[tasks] = np.maximum.reduceat(height[succ],
+                                                    np.cumsum(counts) - counts) + 1
+        return height
+
+    def __sweep(self, rows, combine):
+        # rows[t] = reduce over successors s of combine(s, rows[s]), level by
+        # level from the exits, in chunks of bounded size
+        topo = self.topology
+        width = max(1, rows.shape[1])
+        for tasks in reversed(topo.levels):
+            counts = topo.succ_ptr[tasks + 1] - topo.succ_ptr[tasks]
+            tasks, counts = tasks[counts > 0], counts[counts > 0]
+            bounds = np.cumsum(counts)
+            lo = 0
+            while lo < len(tasks):
+                base = bounds[lo-1] if lo else 0
+                hi = max(lo + 1, int(np.searchsorted(bounds, base + CHUNK_WORDS // width, 'right')))
+                chunk, c = tasks[lo:hi], counts[lo:hi]
+                succ = topo.dst[edge_range(topo.succ_ptr, chunk)]
+                block = combine(succ, rows[succ])
+                rows[chunk] = self.__reduce(block, np.cumsum(c) - c)
+                lo = hi
+
+    def __build_bitset(self):
+        n = self.num_tasks
+        self.bits = np.zeros((n, (n + 63) // 64), dtype='<u8')
+        self.__reduce = np.bitwise_or.reduceat
+
+        def combine(succ, block):
+            block[np.arange(len(succ)), succ >> 6] |= np.left_shift(
+                np.uint64(1), (succ & 63).astype(np.uint64))
+            return block
+        self.__sweep(self.bits, combine)
+
+    def __chain_cover(self):
+        # greedy path cover in topological order: a task extends the chain
+        # of a predecessor that is still that chain's tail
+        topo = self.topology
+        chain = [-1] * self.num_tasks
+        pos = [0] * self.num_tasks
+        tails = []
+        preds = topo.pred_idx.tolist()
+        ptr = topo.pred_ptr.tolist()
+        for t in topo.order.tolist():
+            for u in preds[ptr[t]:ptr[t+1]]:
+                if tails[chain[u]] == u:
+                    chain[t], pos[t] = chain[u], pos[u] + 1
+                    tails[chain[u]] = t
+                    break
+            else:
+                chain[t] = len(tails)
+                tails.append(t)
+        self.chain = np.array(chain, dtype=np.int64)
+        self.chain_pos = np.array(pos, dtype=np.int32)
+        self.num_chains = len(tails)
+
+    def __build_chain(self):
+        # first[t, c]: smallest position on chain c reachable from t
+        unreachable = np.iinfo(np.int32).max
+        self.first = np.full((self.num_tasks, self.num_chains), unreachable, dtype=np.int32)
+        self.__reduce = np.minimum.reduceat
+        chain, chain_pos = self.chain, self.chain_pos
+
+        def combine(succ, block):
+            idx = (np.arange(len(succ)), chain[succ])
+            block[idx] = np.minimum(block[idx], chain_pos[succ])
+            return block
+        self.__sweep(self.first, combine)
+
+    def reaches(self, u, v):
+        # True if there is a path of at least one edge from u to v
+        v = int(v)
+        if self.method == 'bitset':
+            return bool((int(self.bits[u, v >> 6]) >> (v & 63)) & 1)
+        return bool(self.first[u, self.chain[v]] <= self.chain_pos[v])
+
+    def reaches_many(self, u, v):
+        # vectorized reaches over arrays of pairs
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        if self.method == 'bitset':
+            word = self.bits[u, v >> 6]
+            return (np.right_shift(word, (v & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+        return self.first[u, self.chain[v]] <= self.chain_pos[v]
+
+    def descendants_mask(self, tasks):
+        """
+        @param tasks: task id or array of task ids
+        @return: bool array, True for every task reachable from any of them
+        """
+        tasks = np.atleast_1d(np.asarray(tasks, dtype=np.int64))
+        if self.method == 'bitset':
+            row = np.bitwise_or.reduce(self.bits[tasks], axis=0)
+            return np.unpackbits(row.view(np.uint8), bitorder='little')[:self.num_tasks].astype(bool)
+        first = self.first[tasks].min(axis=0) if tasks.size else np.full(self.num_chains, np.iinfo(np.int32).max)
+        return first[self.chain] <= self.chain_pos
+
+    def ancestors_mask(self, v):
+        # bool array, True for every task that reaches v
+        v = int(v)
+        if self.method == 'bitset':
+            word = self.bits[:, v >> 6]
+            return (np.right_shift(word, np.uint64(v & 63)) & np.uint64(1)).astype(bool)
+        return self.first[:, self.chain[v]] <= self.chain_pos[v]
+
+    def comparable(self, u, v):
+        # True if u and v are ordered by the DAG, i.e. cannot run in parallel
+        return self.reaches(u, v) or self.reaches(v, u)
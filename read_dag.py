@@ -1,69 +1,71 @@
 import collections
-import pydot
 import numpy as np
 from random import randint, gauss
 from typing import List
 
 
 def read_dag(filename, p=3, b=0.5, ccr=0.5):
+    import pydot
     graph = pydot.graph_from_dot_file(filename)[0]
-    n_nodes = len(graph.get_nodes())
-
-    # get adjacency matrix for DAG
-    adj_matrix = np.full((n_nodes, n_nodes), -1)
-    n_edges = 0
-    for e in graph.get_edge_list():
-        adj_matrix[int(e.get_source())-1][int(e.get_destination())-1] = 0
-        n_edges += 1
+    nodes = graph.get_node_list()
+    node_ids = [int(n.get_name()) for n in nodes]
+    alpha = [float(n.obj_dict['attributes']['alpha'].split('\"')[1]) for n in nodes]
+    edges = [(int(e.get_source()), int(e.get_destination())) for e in graph.get_edge_list()]
+    src, dst = zip(*edges) if edges else ((), ())
+    return dag_inputs(node_ids, alpha, src, dst, p, b, ccr)
+
+
+def dag_inputs(node_ids, alpha, src, dst, p=3, b=0.5, ccr=0.5):
+    """
+    read_dag's [n_nodes, p, comp_matrix, adj_matrix] from a parsed daggen
+    DAG, drawing the random costs in the same order as read_dag so the same
+    seed gives the same inputs.
+
+    @param node_ids, alpha: node ids (1..n) and alpha sizes in file order
+    @param src, dst: edges in file order
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    n_nodes = len(node_ids)
+    n_edges = len(src)
 
     # if DAG has multiple entry/exit nodes, create dummy nodes in its place
-    ends = np.nonzero(np.all(adj_matrix == -1, axis=1))[0]    # exit nodes
-    starts = np.nonzero(np.all(adj_matrix == -1, axis=0))[0]  # entry nodes
-    start_node = pydot.Node("0", alpha="\"0\"", size="\"0\"")
-    end_node = pydot.Node(str(n_nodes+1), alpha="\"0\"", size="\"0\"")
-    graph.add_node(start_node)
-    graph.add_node(end_node)
-
-    for start in starts:
-        s_edge = pydot.Edge("0", str(start+1), size="\"0\"")
-        graph.add_edge(s_edge)
-
-    for end in ends:
-        e_edge = pydot.Edge(str(end+1), str(n_nodes+1), size="\"0\"")
-        graph.add_edge(e_edge)
-
-    n_nodes = len(graph.get_nodes())
+    has_succ = np.zeros(n_nodes, dtype=bool)
+    has_pred = np.zeros(n_nodes, dtype=bool)
+    has_succ[src-1] = True
+    has_pred[dst-1] = True
+    ends = np.nonzero(~has_succ)[0]    # exit nodes
+    starts = np.nonzero(~has_pred)[0]  # entry nodes
+    node_ids = list(node_ids) + [0, n_nodes+1]
+    alpha = list(alpha) + [0, 0]
+    n_nodes += 2
 
     # construct computation matrix
     comp_matrix = np.empty((n_nodes, p))
     comp_total = 0
-    for n in graph.get_node_list():
-        size_str = n.obj_dict['attributes']['alpha']
-        size = float(size_str.split('\"')[1])
+    for node, size in zip(node_ids, alpha):
         if size == 0:
-            comp_matrix[int(n.get_name())][:] = 0
+            comp_matrix[node][:] = 0
         else:
             comp_temp = np.random.randint(
                 size*(1-b/2), high=size*(1+b/2), size=p)
             comp_temp[comp_temp == 0] = 1
-            comp_matrix[int(n.get_name())][:] = comp_temp
+            comp_matrix[node][:] = comp_temp
             comp_total += np.average(comp_temp)
 
     # get modified adjency matrix
     adj_matrix = np.full((n_nodes, n_nodes), -1)
-    mu = ccr*comp_total/n_edges
-    for e in graph.get_edge_list():
-        source, dest = int(e.get_source()), int(e.get_destination())
-        if source == 0 or dest == n_nodes - 1:
-            adj_matrix[source][dest] = 0
-        else:
-            adj_matrix[int(e.get_source())][int(
-                e.get_destination())] = abs(gauss(mu, mu/4))
+    mu = ccr*comp_total/n_edges if n_edges else 0
+    for source, dest in zip(src.tolist(), dst.tolist()):
+        adj_matrix[source][dest] = abs(gauss(mu, mu/4))
+    adj_matrix[0][starts+1] = 0
+    adj_matrix[ends+1, n_nodes-1] = 0
 
     return [n_nodes, p, comp_matrix, adj_matrix]
 
 
 def read_dag_adj(filename, processors=3, b=0.5, ccr=0.5):
+    import pydot
     graph = pydot.graph_from_dot_file(filename)[0]
     n_nodes = len(graph.get_nodes())
     adj_matrix = np.full((n_nodes, n_nodes), -1)
@@ -107,6 +109,7 @@ def read_dag_adj(filename, processors=3, b=0.5, ccr=0.5):
 
 
 def read_dag_adjacency(filename):
+    import pydot
     graph = pydot.graph_from_dot_file(filename)[0]
     n_nodes = len(graph.get_nodes())
 
@@ -152,6 +155,60 @@ def read_dag_adjacency(filename):
     return [n_nodes, sizes, adj_matrix]
 
 
+def random_dag(n, p=3, b=0.5, ccr=0.5, density=0.2, minalpha=20, maxalpha=200, seed=None, sparse=False):
+    # Random DAG in the same format as read_dag, with the same cost model
+    # (alpha sizes, heterogeneity b, mean comm cost ccr * avg comp). Used to
+    # fuzz the schedulers without generating .dot files. With sparse=True
+    # the graph is returned as a Topology instead of an adjacency matrix,
+    # so very large DAGs fit in memory.
+    rng = np.random.default_rng(seed)
+    n_nodes = n + 2
+
+    # edges only go from lower to higher ids, so the graph is acyclic
+    if sparse:
+        m = rng.binomial(n*(n-1)//2, density)
+        u, v = rng.integers(0, n, size=(2, m))
+        keep = u != v
+        pairs = np.unique(np.minimum(u, v)[keep] * n + np.maximum(u, v)[keep])
+        src, dst = pairs // n, pairs % n
+    else:
+        src, dst = np.nonzero(np.triu(rng.random((n, n)) < density, k=1))
+    src, dst = src + 1, dst + 1
+    n_edges = len(src)
+
+    # dummy entry / exit nodes as in read_dag
+    sizes = np.zeros(n_nodes)
+    sizes[1:-1] = rng.uniform(minalpha, maxalpha, size=n)
+    comp_matrix = np.zeros((n_nodes, p))
+    low, high = sizes[1:-1]*(1-b/2), sizes[1:-1]*(1+b/2)
+    comp_temp = np.floor(rng.uniform(low[:, None], high[:, None], size=(n, p)))
+    comp_temp[comp_temp <= 0] = 1
+    comp_matrix[1:-1] = comp_temp
+    comp_total = comp_temp.mean(axis=1).sum()
+
+    cost = np.zeros(0)
+    if n_edges:
+        mu = ccr*comp_total/n_edges
+        cost = np.abs(rng.normal(mu, mu/4, size=n_edges))
+    nodes = np.arange(1, n + 1)
+    starts = nodes[np.bincount(dst, minlength=n_nodes)[1:-1] == 0]
+    ends = nodes[np.bincount(src, minlength=n_nodes)[1:-1] == 0]
+
+    if sparse:
+        from topology import Topology
+        graph = Topology(n_nodes,
+                         np.concatenate([np.zeros(len(starts), dtype=np.int64), src, ends]),
+                         np.concatenate([starts, dst, np.full(len(ends), n_nodes-1)]),
+                         np.concatenate([np.zeros(len(starts)), cost, np.zeros(len(ends))]))
+    else:
+        graph = np.full((n_nodes, n_nodes), -1.0)
+        graph[src, dst] = cost
+        graph[0, starts] = 0
+        graph[ends, n_nodes-1] = 0
+
+    return [n_nodes, p, comp_matrix, graph]
+
+
 if __name__ == "__main__":
     n_nodes, p, comp_matrix, adj_matrix = read_dag('dag/10_0.1_0.2_0.2_1.dot')
     print('No. of nodes: {}\nNo. pf processors: {}\nComputation Matrix:\n{}\nAdjacency Matrix:\n{}\n'.format(
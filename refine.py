@@ -0,0 +1,225 @@
+import heapq
+import random
+import time
+from bisect import bisect_left
+import numpy as np
+
+
+class LocalSearch:
+    """
+    Local-search refinement of a finished schedule.
+
+    The schedule is viewed as a processor assignment plus an execution order
+    on each processor. All processor orders follow one fixed topological
+    order of the tasks (the original start times), so any reassignment keeps
+    the combined precedence + processor-order graph acyclic. A move either
+    reassigns one task to another processor or swaps the processors of two
+    tasks; its effect is evaluated incrementally by re-timing only the tasks
+    reachable from the moved ones, in topological order, stopping wherever
+    a finish time does not change. A move is kept if it shortens the
+    makespan, or keeps it and lowers the sum of finish times; otherwise it
+    is undone.
+
+    Per-task state is kept in Python lists: moves touch a handful of tasks
+    with few predecessors each, where NumPy call overhead would dominate.
+    """
+
+    def __init__(self, schedule, seed=None):
+        """
+        @param schedule: duplication-free Schedule to refine (left unchanged)
+        @param seed: seed of the move generator
+        """
+        if len(schedule.dup_task):
+            raise ValueError('Local search does not support duplicated tasks')
+        if schedule.contention is not None:
+            raise ValueError('Local search does not support link contention')
+        if len(schedule.res_proc):
+            raise ValueError('Local search does not support processor reservations')
+        self.base = schedule
+        self.topology = schedule.topology
+        self.comp_cost = schedule.comp_cost
+        self.num_processors = schedule.num_processors
+        self.rng = random.Random(seed)
+
+        n = schedule.num_tasks
+        topo = self.topology
+        self.w = self.comp_cost.tolist()
+        self.inv_bandwidth = schedule.comm.inv_bandwidth.tolist()
+        self.latency = schedule.comm.latency.tolist()
+        self.preds = [list(zip(topo.pred_idx[lo:hi].tolist(), topo.pred_cost[lo:hi].tolist()))
+                      for lo, hi in zip(topo.pred_ptr[:-1].tolist(), topo.pred_ptr[1:].tolist())]
+        self.succs = [topo.dst[lo:hi].tolist()
+                      for lo, hi in zip(topo.succ_ptr[:-1].tolist(), topo.succ_ptr[1:].tolist())]
+        self.sinks = topo.exits.tolist()
+        self.proc = schedule.proc_id.tolist()
+        self.start = schedule.start.tolist()
+        self.end = schedule.end.tolist()
+
+        # fixed global order: original start times, ties by topological order
+        topo_pos = np.empty(n, dtype=np.int64)
+        topo_pos[topo.order] = np.arange(n)
+        order = np.lexsort((topo_pos, schedule.end, schedule.start)).tolist()
+        self.pos = [0] * n
+        for i, t in enumerate(order):
+            self.pos[t] = i
+        self.seq = [[] for _ in range(self.num_processors)]
+        self.keys = [[] for _ in range(self.num_processors)]
+        for t in order:
+            self.seq[self.proc[t]].append(t)
+            self.keys[self.proc[t]].append(self.pos[t])
+
+        self.total = sum(self.end)
+        self.__retime(order)    # semi-active timing
+        self.makespan = max(self.end[t] for t in self.sinks)
+        self.moves = 0
+        self.accepted = 0
+
+    def __prev_next(self, t):
+        p = self.proc[t]
+        i = bisect_left(self.keys[p], self.pos[t])
+        prev = self.seq[p][i-1] if i > 0 else -1
+        nxt = self.seq[p][i+1] if i + 1 < len(self.seq[p]) else -1
+        return prev, nxt
+
+    def __assign(self, t, p):
+        # move t from its processor to p, keeping both orders; returns the
+        # tasks whose predecessors or input message times changed
+        old = self.proc[t]
+        _, old_next = self.__prev_next(t)
+        i = bisect_left(self.keys[old], self.pos[t])
+        del self.seq[old][i], self.keys[old][i]
+        j = bisect_left(self.keys[p], self.pos[t])
+        self.seq[p].insert(j, t)
+        self.keys[p].insert(j, int(self.pos[t]))
+        self.proc[t] = p
+        dirty = [t] + self.succs[t]
+        if old_next >= 0:
+            dirty.append(old_next)
+        if j + 1 < len(self.seq[p]):
+            dirty.append(self.seq[p][j+1])
+        return dirty
+
+    def __retime(self, dirty, log=None):
+        # recompute start/end of dirty tasks and everything their finish
+        # times reach, in topological (pos) order
+        pos, proc, start, end = self.pos, self.proc, self.start, self.end
+        heap = [(pos[t], t) for t in set(dirty)]
+        heapq.heapify(heap)
+        queued = set(dirty)
+        while heap:
+            _, t = heapq.heappop(heap)
+            queued.discard(t)
+            p = proc[t]
+            ready = 0.0
+            for u, c in self.preds[t]:
+                q = proc[u]
+                arrive = end[u] if q == p else (
+                    end[u] + c * self.inv_bandwidth[q][p] + self.latency[q][p])
+                if arrive > ready:
+                    ready = arrive
+            prev, nxt = self.__prev_next(t)
+            if prev >= 0 and end[prev] > ready:
+                ready = end[prev]
+            finish = ready + self.w[t][p]
+            if ready == start[t] and finish == end[t]:
+                continue
+            if log is not None:
+                log.append((t, start[t], end[t]))
+            self.total += finish - end[t]
+            start[t], end[t] = ready, finish
+            succ = self.succs[t] + [nxt] if nxt >= 0 else self.succs[t]
+            for s in succ:
+                if s not in queued:
+                    queued.add(s)
+                    heapq.heappush(heap, (pos[s], s))
+
+    def critical_path(self):
+        # tasks on a longest chain ending at the makespan
+        t = max(self.sinks, key=self.end.__getitem__)
+        path = [t]
+        while self.start[t] > 0:
+            prev, _ = self.__prev_next(t)
+            if prev >= 0 and self.end[prev] >= self.start[t]:
+                t = prev
+            else:
+                p = self.proc[t]
+                t = max(self.preds[t], key=lambda uc: self.end[uc[0]] + (
+                    0 if self.proc[uc[0]] == p else
+                    uc[1] * self.inv_bandwidth[self.proc[uc[0]]][p] +
+                    self.latency[self.proc[uc[0]]][p]))[0]
+            path.append(t)
+        return path
+
+    def __try(self, assignments):
+        # apply a move, keep it if the makespan shrinks, undo it otherwise
+        log = []
+        undo = []
+        dirty = []
+        total = self.total
+        for t, p in assignments:
+            undo.append((t, self.proc[t]))
+            dirty.extend(self.__assign(t, p))
+        self.__retime(dirty, log)
+        makespan = max(self.end[t] for t in self.sinks)
+        self.moves += 1
+        if makespan < self.makespan or (makespan == self.makespan and self.total < total):
+            self.makespan = makespan
+            self.accepted += 1
+            return True
+        for t, p in reversed(undo):
+            self.__assign(t, p)
+        for t, start, end in reversed(log):
+            self.start[t], self.end[t] = start, end
+        self.total = total
+        return False
+
+    def improve(self, budget_ms=10, max_moves=None, stop=None):
+        """
+        Apply random moves until the time budget is used up.
+
+        @param budget_ms: time budget in milliseconds
+        @param max_moves: optional bound on the number of moves tried
+        @param stop: optional callable, the search stops once it returns True
+        @return: the makespan after refinement
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        n, P = len(self.proc), self.num_processors
+        if P < 2:
+            return self.makespan
+        path = self.critical_path()
+        tried = 0
+        while time.perf_counter() < deadline:
+            if (max_moves is not None and tried >= max_moves) or (stop is not None and stop()):
+                break
+            tried += 1
+            # moves mostly target the critical path
+            t = self.rng.choice(path) if self.rng.random() < 0.8 else self.rng.randrange(n)
+            if self.rng.random() < 0.5:
+                p = self.rng.randrange(P - 1)
+                p += p >= self.proc[t]
+                move = [(t, p)]
+            else:
+                u = self.rng.randrange(n)
+                if self.proc[u] == self.proc[t]:
+                    continue
+                move = [(t, self.proc[u]), (u, self.proc[t])]
+            if self.__try(move):
+                path = self.critical_path()
+        return self.makespan
+
+    def to_schedule(self):
+        schedule = self.base.copy()
+        schedule.proc_id[:] = self.proc
+        schedule.start[:] = self.start
+        schedule.end[:] = self.end
+        schedule.rebuild_lanes()
+        return schedule
+
+
+def refine(schedule, budget_ms=10, seed=None):
+    # refined copy of schedule, never worse than the input
+    search = LocalSearch(schedule, seed)
+    search.improve(budget_ms)
+    if search.makespan >= schedule.makespan():
+        return schedule.copy()
+    return search.to_schedule()
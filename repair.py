@@ -0,0 +1,165 @@
+import heapq
+import numpy as np
+
+
+class ScheduleRepair:
+    """
+    Incremental repair of a finished schedule when reality deviates from it.
+
+    Only the tasks whose inputs change are touched: the closure of the
+    disturbed tasks under DAG successors is taken out of the slot index and
+    put back in rank order (the ranks cached in the schedule, released as a
+    ready list so precedence always holds). Tasks that keep their processor
+    take the earliest slot on it; tasks of a lost processor take the best
+    EFT over the remaining ones. Every other task keeps its slot.
+
+    Duplicated copies of disturbed tasks are dropped rather than repaired,
+    which in turn disturbs the successors that used them.
+    """
+
+    def __init__(self, schedule):
+        """
+        @param schedule: Schedule to repair; it is copied, not modified
+        """
+        if schedule.contention is not None:
+            raise ValueError('Schedule repair does not support link contention')
+        self.schedule = schedule.copy()
+        # observed durations overwrite entries of the cost matrix
+        self.schedule.comp_cost = self.schedule.comp_cost.copy()
+        self.removed = set()
+
+    def report_finish(self, t, actual_end):
+        """
+        Task t finished at actual_end instead of its planned end.
+
+        @return: (schedule, changes), changes being (task, proc, start, end)
+                 of every task whose slot moved
+        """
+        s = self.schedule
+        p = int(s.proc_id[t])
+        s.lanes[p].remove(s.start[t], t)
+        s.comp_cost[t][p] = actual_end - s.start[t]
+        s.place(t, p, s.start[t])
+
+        # successors need t's output; tasks on p overlapping the overrun
+        # lose their slot
+        seeds = s.topology.successors(t)[0].tolist()
+        lane = s.lanes[p]
+        overlap = [u for u, start, end in zip(lane.ids, lane.starts, lane.ends)
+                   if u >= 0 and u != t and start < actual_end and end > s.start[t]]
+        for u in overlap:
+            if s.proc_id[u] == p:
+                seeds.append(u)
+            else:
+                copy = np.flatnonzero((s.dup_task == u) & (s.dup_proc == p))
+                self.__drop_copies(copy)
+                seeds.extend(s.topology.successors(u)[0].tolist())
+        return s, self.__reschedule(self.__affected(seeds), set(), actual_end)
+
+    def remove_processor(self, pid, at_time):
+        """
+        Processor pid fails at at_time. Tasks on it that had not finished
+        are moved to other processors, starting no earlier than at_time.
+
+        @return: (schedule, changes), changes being (task, proc, start, end)
+                 of every task whose slot moved
+        """
+        s = self.schedule
+        self.removed.add(pid)
+        lost = np.flatnonzero((s.proc_id == pid) & (s.end > at_time)).tolist()
+
+        # unfinished copies of duplicated tasks on pid are dropped
+        seeds = list(lost)
+        lost_dups = np.flatnonzero((s.dup_proc == pid) & (s.dup_end > at_time))
+        for u in self.__drop_copies(lost_dups):
+            seeds.extend(s.topology.successors(u)[0].tolist())
+        s.reserve(pid, at_time, float('inf'))
+        return s, self.__reschedule(self.__affected(seeds), set(lost), at_time)
+
+    def __drop_copies(self, idx):
+        # remove duplicated copies idx, returns the tasks they belonged to
+        s = self.schedule
+        tasks = s.dup_task[idx].tolist()
+        for i in np.asarray(idx).tolist():
+            s.lanes[s.dup_proc[i]].remove(s.dup_start[i], s.dup_task[i])
+        if len(tasks):
+            keep = np.ones(len(s.dup_task), dtype=bool)
+            keep[idx] = False
+            for name in ('dup_task', 'dup_proc', 'dup_start', 'dup_end'):
+                setattr(s, name, getattr(s, name)[keep])
+            s.has_dup[:] = False
+            s.has_dup[s.dup_task] = True
+        return tasks
+
+    def __affected(self, seeds):
+        # seeds and their descendants; copies of those tasks are dropped,
+        # which affects the successors that may have used the copies
+        s = self.schedule
+        affected = self.__descendants(seeds)
+        while True:
+            idx = np.flatnonzero(np.isin(s.dup_task, list(affected)))
+            if idx.size == 0:
+                return affected
+            succ = []
+            for u in self.__drop_copies(idx):
+                succ.extend(s.topology.successors(u)[0].tolist())
+            affected |= self.__descendants(succ)
+
+    def __descendants(self, tasks):
+        # tasks and everything reachable from them: from the reachability
+        # index if the topology already has one, else a DFS over only the
+        # affected tasks (building the index costs O(N^2 / 64) up front)
+        topo = self.schedule.topology
+        reach = topo.cached_reachability
+        if reach is not None:
+            mask = reach.descendants_mask(list(tasks))
+            return set(tasks) | set(np.flatnonzero(mask).tolist())
+        seen = set(tasks)
+        stack = list(tasks)
+        while stack:
+            for v in topo.successors(stack.pop())[0].tolist():
+                if v not in seen:
+                    seen.add(v)
+                    stack.append(v)
+        return seen
+
+    def __reschedule(self, affected, movable, now):
+        s = self.schedule
+        topo = s.topology
+        old = {t: (int(s.proc_id[t]), s.start[t], s.end[t]) for t in affected}
+        for t in affected:
+            s.lanes[s.proc_id[t]].remove(s.start[t], t)
+
+        # ready list over the affected tasks, highest cached rank first
+        indeg = {t: 0 for t in affected}
+        for t in affected:
+            for v in topo.successors(t)[0].tolist():
+                if v in indeg:
+                    indeg[v] += 1
+        ready = [(-s.rank[t], t) for t, d in indeg.items() if d == 0]
+        heapq.heapify(ready)
+        allowed = np.ones(s.num_processors, dtype=bool)
+        allowed[list(self.removed)] = False
+        while ready:
+            _, t = heapq.heappop(ready)
+            data_ready = np.maximum(s.ready_times(t), now)
+            if t in movable:
+                est = s.earliest_starts(t, data_ready)
+                eft = np.where(allowed, est + s.comp_cost[t], np.inf)
+                p = int(np.argmin(eft))
+                s.place(t, p, est[p])
+            else:
+                p = int(s.proc_id[t])
+                s.place(t, p, s.lanes[p].earliest_start(data_ready[p], s.comp_cost[t][p]))
+            for v in topo.successors(t)[0].tolist():
+                if v in indeg:
+                    indeg[v] -= 1
+                    if indeg[v] == 0:
+                        heapq.heappush(ready, (-s.rank[v], v))
+
+        changes = []
+        for t in sorted(affected):
+            new = (int(s.proc_id[t]), s.start[t], s.end[t])
+            if new != old[t]:
+                changes.append((t,) + new)
+        return changes
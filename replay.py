@@ -0,0 +1,133 @@
+# python replay.py failures/task20.dot_0.5_0.1_4_0-IPEFT.npz --pdb
+# python replay.py failures/*.npz --profile
+
+import json
+import os
+import random
+import numpy as np
+from topology import Topology, as_topology
+
+VERSION = 1
+
+
+def bundle_name(key, algorithm):
+    # file name of the bundle of a sweep case (main_parallel.case_key)
+    return '{}-{}.npz'.format(key.replace('|', '_').replace('/', '_'), algorithm)
+
+
+def write_bundle(directory, key, case, inputs, algorithm, state, error, seed=None, ranks=None):
+    """
+    Save everything needed to re-run one failed scheduler call as a
+    compressed .npz: costs and edge list of the DAG, the random state the
+    algorithm started from, the ranks it was given, the case parameters
+    and the traceback. Written to a temporary file and renamed, so
+    concurrent workers never leave partial bundles.
+
+    @param key: case key, names the file
+    @param state: random.getstate() before the algorithm ran
+    @param error: formatted traceback
+    @param ranks: precomputed ranks passed to the algorithm, array or dict
+    @return: path of the bundle
+    """
+    os.makedirs(directory, exist_ok=True)
+    topology = as_topology(inputs[3])
+    version, mt, gauss = state
+    meta = {'version': VERSION, 'key': key, 'case': case, 'algorithm': algorithm,
+            'seed': seed, 'traceback': error, 'num_processors': int(inputs[1]),
+            'matrix': None if isinstance(inputs[3], Topology) else str(np.asarray(inputs[3]).dtype),
+            'random_version': version, 'random_gauss': gauss,
+            'ranks': None if ranks is None else sorted(ranks) if isinstance(ranks, dict) else ''}
+    arrays = {'comp_cost': np.asarray(inputs[2], dtype=float), 'src': topology.src,
+              'dst': topology.dst, 'cost': topology.cost,
+              'random_state': np.array(mt, dtype=np.uint32)}
+    if isinstance(ranks, dict):
+        arrays.update(('rank_' + k, np.asarray(v)) for k, v in ranks.items())
+    elif ranks is not None:
+        arrays['rank_'] = np.asarray(ranks)
+
+    path = os.path.join(directory, bundle_name(key, algorithm))
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, meta=np.frombuffer(json.dumps(meta, default=str).encode(), dtype=np.uint8),
+                            **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load_bundle(path):
+    """
+    @return: dict of meta (see write_bundle), inputs as read_dag returns
+             them, state for random.setstate and ranks
+    """
+    with np.load(path) as data:
+        meta = json.loads(data['meta'].tobytes())
+        comp_cost = data['comp_cost']
+        n = len(comp_cost)
+        if meta['matrix']:
+            # read_dag's adjacency matrix, -1 = no edge, of the original dtype
+            graph = np.full((n, n), -1, dtype=meta['matrix'])
+            graph[data['src'], data['dst']] = data['cost']
+        else:
+            graph = Topology(n, data['src'], data['dst'], data['cost'])
+        state = (meta['random_version'], tuple(int(v) for v in data['random_state']),
+                 meta['random_gauss'])
+        ranks = meta['ranks']
+        if ranks == '':
+            ranks = data['rank_']
+        elif ranks is not None:
+            ranks = {k: data['rank_' + k] for k in ranks}
+    return {'meta': meta, 'inputs': [n, meta['num_processors'], comp_cost, graph],
+            'state': state, 'ranks': ranks}
+
+
+def replay(path, profile=None, debug=False):
+    """
+    Re-run the failed case of a bundle: same algorithm, inputs, ranks and
+    random state.
+
+    @param profile: run under cProfile and write the stats to this file,
+                    or print them if True
+    @param debug: enter pdb post-mortem if it raises again
+    @return: (bundle, makespan), makespan None if it raised again
+    """
+    import traceback
+    from main_parallel import ALGORITHMS
+    from bounds import lower_bounds
+    bundle = load_bundle(path)
+    meta = bundle['meta']
+    inputs = bundle['inputs']
+    options = {} if bundle['ranks'] is None else {'ranks': bundle['ranks']}
+    random.setstate(bundle['state'])
+
+    def call():
+        # failures before any algorithm ran are in the lower bounds
+        if meta['algorithm'] == 'lower_bounds':
+            return lower_bounds(inputs[2], inputs[3])['lower_bound']
+        return ALGORITHMS[meta['algorithm']](input_list=inputs, **options).makespan
+
+    makespan = None
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    try:
+        makespan = profiler.runcall(call) if profiler else call()
+    except Exception:
+        traceback.print_exc()
+        if debug:
+            import pdb
+            pdb.post_mortem()
+    finally:
+        if profiler:
+            import pstats
+            if profile is True:
+                pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+            else:
+                profiler.dump_stats(profile)
+    return bundle, makespan
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+    main(['replay'] + sys.argv[1:])
@@ -0,0 +1,346 @@
+import numpy as np
+from Processor import Processor
+from Task import Task
+from comm import CommModel
+from timeline import Timeline
+
+
+class Schedule:
+    """
+    Struct-of-arrays schedule shared by all list schedulers.
+
+    Task i runs on processor proc_id[i] from start[i] to end[i]; rank[i] is
+    the priority the scheduler used. Unscheduled tasks have proc_id == -1 and
+    NaN times. Each processor additionally keeps a Timeline of its busy
+    intervals, which is the slot index used for insertion-based EST search.
+
+    With task duplication, extra copies of a task are kept in the dup_task,
+    dup_proc, dup_start and dup_end arrays. A successor may take its input
+    from whichever copy of a predecessor delivers it first.
+
+    Reservations (res_proc, res_start, res_end) are intervals in which a
+    processor is not available to the scheduler.
+
+    Message times between processors come from a CommModel, by default the
+    uniform one that charges each edge cost between distinct processors.
+
+    With link contention, messages also need a free slot on the link they
+    use: one Timeline per directed processor pair ('link') or a single one
+    shared by all transfers ('bus'). The messages of a task are booked when
+    it is placed, as (pred, task, src, dst, start, end) entries of messages.
+    """
+
+    def __init__(self, comp_cost, topology=None, comm=None, contention=None):
+        """
+        @param comp_cost: (num_tasks, num_processors) computation cost matrix
+        @param topology: Topology of the task graph, needed for ready times
+        @param comm: CommModel, uniform if None
+        @param contention: None, 'link' or 'bus'
+        """
+        self.comp_cost = np.asarray(comp_cost, dtype=float)
+        self.num_tasks, self.num_processors = self.comp_cost.shape
+        self.topology = topology
+        self.comm = comm if comm is not None else CommModel.uniform(self.num_processors)
+        if contention not in (None, 'link', 'bus'):
+            raise ValueError('Unknown contention model {}'.format(contention))
+        self.contention = contention
+        self.links = {}
+        self.messages = []
+
+        self.proc_id = np.full(self.num_tasks, -1, dtype=np.int32)
+        self.start = np.full(self.num_tasks, np.nan)
+        self.end = np.full(self.num_tasks, np.nan)
+        self.rank = np.zeros(self.num_tasks)
+        self.lanes = [Timeline() for _ in range(self.num_processors)]
+
+        self.dup_task = np.zeros(0, dtype=np.int64)
+        self.dup_proc = np.zeros(0, dtype=np.int32)
+        self.dup_start = np.zeros(0)
+        self.dup_end = np.zeros(0)
+        self.has_dup = np.zeros(self.num_tasks, dtype=bool)
+
+        self.res_proc = np.zeros(0, dtype=np.int32)
+        self.res_start = np.zeros(0)
+        self.res_end = np.zeros(0)
+
+    def copy(self):
+        new = Schedule(self.comp_cost, self.topology, self.comm, self.contention)
+        for name in ('proc_id', 'start', 'end', 'rank', 'dup_task', 'dup_proc',
+                     'dup_start', 'dup_end', 'has_dup',
+                     'res_proc', 'res_start', 'res_end'):
+            setattr(new, name, getattr(self, name).copy())
+        new.messages = list(self.messages)
+        new.rebuild_lanes()
+        return new
+
+    def rebuild_lanes(self):
+        # rebuild the slot index after the arrays were edited directly
+        self.lanes = [Timeline() for _ in range(self.num_processors)]
+        task, proc, start, end = self.instances()
+        task = np.concatenate([task, np.full(len(self.res_proc), -1)])
+        proc = np.concatenate([proc, self.res_proc])
+        start = np.concatenate([start, self.res_start])
+        end = np.concatenate([end, self.res_end])
+        order = np.lexsort((end, start))
+        for t, p, s, e in zip(task[order].tolist(), proc[order].tolist(),
+                              start[order].tolist(), end[order].tolist()):
+            self.lanes[p].insert(s, e, t)
+        self.links = {}
+        for _, t, src, dst, s, e in self.messages:
+            self.__link(src, dst).insert(s, e, t)
+
+    def __link(self, src, dst):
+        # Timeline of the link from src to dst, created on first use
+        key = 'bus' if self.contention == 'bus' else (src, dst)
+        lane = self.links.get(key)
+        if lane is None:
+            lane = self.links[key] = Timeline()
+        return lane
+
+    def __link_arrivals(self, t, pre, c, book=None):
+        # (k, P) arrival times when the message of predecessor j reaches p
+        # through the earliest free slot of its link. The messages to one
+        # processor are placed one after another in order of their send
+        # time, tentatively unless book is that processor.
+        proc = self.proc_id[pre]
+        arrive = np.repeat(self.end[pre, None], self.num_processors, axis=1)
+        duration = self.comm.arrival(np.zeros(len(pre)), c, proc).tolist()
+        proc, send = proc.tolist(), self.end[pre].tolist()
+        by_send = sorted(range(len(proc)), key=send.__getitem__)
+        for p in (range(self.num_processors) if book is None else [book]):
+            booked = []
+            for j in by_send:
+                if proc[j] == p or duration[j][p] <= 0:
+                    continue
+                lane = self.__link(proc[j], p)
+                s = lane.earliest_start(send[j], duration[j][p])
+                lane.insert(s, s + duration[j][p], t)
+                booked.append((lane, s))
+                arrive[j, p] = s + duration[j][p]
+                if book is not None:
+                    self.messages.append((int(pre[j]), int(t), proc[j], p, s, s + duration[j][p]))
+            if book is None:
+                for lane, s in booked:
+                    lane.remove(s, t)
+        return arrive
+
+    def reserve(self, p, start, end):
+        # make processor p unavailable during [start, end)
+        self.res_proc = np.append(self.res_proc, np.int32(p))
+        self.res_start = np.append(self.res_start, start)
+        self.res_end = np.append(self.res_end, end)
+        self.lanes[p].insert(start, end, -1)
+
+    def load_reservations(self, reservations=None, availability=None):
+        """
+        Take processor time that is already in use before any task is placed.
+
+        @param reservations: (proc, start, end) busy intervals, e.g. existing
+                             load or maintenance windows
+        @param availability: {proc: [(start, end), ...]} windows in which a
+                             processor may be used; the time outside them is
+                             reserved. Processors not listed are always
+                             available.
+        """
+        busy = [(int(p), float(s), float(e)) for p, s, e in (reservations or [])]
+        for p, windows in (availability or {}).items():
+            free_from = 0.0
+            for s, e in sorted(windows):
+                busy.append((int(p), free_from, float(s)))
+                free_from = max(free_from, float(e))
+            busy.append((int(p), free_from, float('inf')))
+
+        # lanes need disjoint intervals: merge overlapping ones per processor
+        merged = []
+        for p, s, e in sorted(b for b in busy if b[2] > b[1]):
+            if merged and merged[-1][0] == p and s <= merged[-1][2]:
+                merged[-1][2] = max(merged[-1][2], e)
+            else:
+                merged.append([p, s, e])
+        if merged:
+            p, s, e = np.array(merged).T
+            self.res_proc = np.concatenate([self.res_proc, p.astype(np.int32)])
+            self.res_start = np.concatenate([self.res_start, s])
+            self.res_end = np.concatenate([self.res_end, e])
+            self.rebuild_lanes()
+
+    def arrival_times(self, t):
+        # (k, P): time at which the data of each of the k predecessors of t
+        # is available on each processor, from the earliest copy of that
+        # predecessor; messages between copies on the same processor are free
+        pre, c = self.topology.predecessors(t)
+        proc = self.proc_id[pre]
+        if np.any(proc < 0):
+            raise ValueError(
+                'Task {} is scheduled before its predecessors'.format(t))
+        if self.contention is not None:
+            return self.__link_arrivals(t, pre, c)
+        arrive = self.comm.arrival(self.end[pre], c, proc)
+        if np.any(self.has_dup[pre]):
+            d = np.flatnonzero(np.isin(self.dup_task, pre))
+            j = np.searchsorted(pre, self.dup_task[d])
+            dup_arrive = self.comm.arrival(self.dup_end[d], c[j], self.dup_proc[d])
+            np.minimum.at(arrive, j, dup_arrive)
+        return arrive
+
+    def ready_times(self, t):
+        # time at which all input data of t is available on each processor
+        if self.topology.pred_ptr[t] == self.topology.pred_ptr[t+1]:
+            return np.zeros(self.num_processors)
+        return np.maximum(self.arrival_times(t).max(axis=0), 0)
+
+    def earliest_starts(self, t, ready=None):
+        # insertion-based EST of t on every processor
+        if ready is None:
+            ready = self.ready_times(t)
+        w = self.comp_cost[t]
+        return np.array([lane.earliest_start(ready[p], w[p])
+                         for p, lane in enumerate(self.lanes)])
+
+    def place(self, t, p, start):
+        if self.contention is not None:
+            pre, c = self.topology.predecessors(t)
+            self.__link_arrivals(t, pre, c, book=p)
+        end = start + self.comp_cost[t][p]
+        self.proc_id[t] = p
+        self.start[t] = start
+        self.end[t] = end
+        self.lanes[p].insert(start, end, t)
+
+    def duplicate_starts(self, t):
+        """
+        EST of t on each processor p where duplicating its critical parent,
+        the predecessor whose data arrives last on p, into an idle slot of p
+        makes that data arrive earlier.
+
+        @return: {p: (est of t, parent, start of the parent copy)}
+        """
+        if self.contention is not None:
+            raise ValueError('Task duplication is not supported with link contention')
+        pre, _ = self.topology.predecessors(t)
+        if pre.size == 0:
+            return {}
+        arrive = self.arrival_times(t)
+        critical = np.argmax(arrive, axis=0)
+        parent_ready = {}
+        candidates = {}
+        for p, j in enumerate(critical.tolist()):
+            u = int(pre[j])
+            if self.proc_id[u] == p or np.any(self.dup_proc[self.dup_task == u] == p):
+                continue    # a copy of u already runs on p
+            if j not in parent_ready:
+                parent_ready[j] = self.ready_times(u)
+            lane = self.lanes[p]
+            u_start = lane.earliest_start(parent_ready[j][p], self.comp_cost[u][p])
+            u_end = u_start + self.comp_cost[u][p]
+            if u_end >= arrive[j, p]:
+                continue
+            ready = max(np.max(np.delete(arrive[:, p], j), initial=0), u_end, 0)
+
+            # EST of t with the copy of u occupying its slot
+            lane.insert(u_start, u_end, u)
+            est = lane.earliest_start(ready, self.comp_cost[t][p])
+            lane.remove(u_start, u)
+            candidates[p] = (est, u, u_start)
+        return candidates
+
+    def place_duplicate(self, t, p, start):
+        if self.contention is not None:
+            raise ValueError('Task duplication is not supported with link contention')
+        end = start + self.comp_cost[t][p]
+        self.dup_task = np.append(self.dup_task, t)
+        self.dup_proc = np.append(self.dup_proc, np.int32(p))
+        self.dup_start = np.append(self.dup_start, start)
+        self.dup_end = np.append(self.dup_end, end)
+        self.has_dup[t] = True
+        self.lanes[p].insert(start, end, t)
+
+    def instances(self):
+        # (task, proc, start, end) of every scheduled copy of every task,
+        # primaries first
+        ids = np.flatnonzero(self.proc_id >= 0)
+        return (np.concatenate([ids, self.dup_task]),
+                np.concatenate([self.proc_id[ids], self.dup_proc]),
+                np.concatenate([self.start[ids], self.dup_start]),
+                np.concatenate([self.end[ids], self.dup_end]))
+
+    def finish_times(self):
+        # completion of each task: the earliest finishing copy
+        finish = self.end.copy()
+        np.minimum.at(finish, self.dup_task, self.dup_end)
+        return finish
+
+    def makespan(self):
+        return float(max(np.max(self.end), np.max(self.dup_end, initial=0)))
+
+    def utility(self, offset=10000):
+        return float(offset - np.sum(self.finish_times()))
+
+    def busy_time(self):
+        # total computation time on each processor, duplicates included
+        task, proc, start, end = self.instances()
+        return np.bincount(proc, weights=end - start,
+                           minlength=self.num_processors)
+
+    def timeline(self, p):
+        # ids of the tasks on processor p, in order of start time
+        task, proc, start, end = self.instances()
+        idx = np.flatnonzero(proc == p)
+        return task[idx[np.lexsort((end[idx], start[idx]))]]
+
+    def __sorted_instances(self):
+        # instances sorted by (processor, start, end) and lane boundaries
+        task, proc, start, end = self.instances()
+        order = np.lexsort((end, start, proc))
+        bounds = np.searchsorted(proc[order], np.arange(1, self.num_processors))
+        return task[order], start[order], end[order], bounds
+
+    def timelines(self):
+        # timeline of every processor from one sort
+        task, _, _, bounds = self.__sorted_instances()
+        return np.split(task, bounds)
+
+    def lines(self, proc_offset=0, task_offset=0):
+        # text dump of the timelines, produced one line at a time
+        task, start, end, bounds = self.__sorted_instances()
+        task, start, end = task.tolist(), start.tolist(), end.tolist()
+        bounds = [0] + bounds.tolist() + [len(task)]
+        for p in range(self.num_processors):
+            yield 'Processor {}:\n '.format(p + proc_offset)
+            for i in range(bounds[p], bounds[p+1]):
+                yield 'Task {}: start = {}, end = {}\n'.format(
+                    task[i] + task_offset, start[i], end[i])
+
+    def write_text(self, file, proc_offset=0, task_offset=0):
+        file.writelines(self.lines(proc_offset, task_offset))
+
+    def columns(self):
+        # one row per task copy; duplicate marks the extra copies
+        task, proc, start, end = self.instances()
+        duplicate = np.zeros(len(task), dtype=np.int8)
+        duplicate[len(task) - len(self.dup_task):] = 1
+        return {'task': task.astype(np.int32),
+                'proc_id': proc,
+                'start': start,
+                'end': end,
+                'rank': self.rank[task],
+                'duplicate': duplicate}
+
+    def to_csv(self, path):
+        np.savetxt(path, np.column_stack(list(self.columns().values())),
+                   fmt=['%d', '%d', '%.17g', '%.17g', '%.17g', '%d'], delimiter=',',
+                   header=','.join(self.columns()), comments='')
+
+    def to_arrow(self, path):
+        # Arrow IPC (Feather v2) file, compressed columnar; needs pyarrow
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        feather.write_feather(pa.table(self.columns()), path)
+
+    def tasks(self, ids=None):
+        if ids is None:
+            ids = range(self.num_tasks)
+        return [Task(int(i), self) for i in ids]
+
+    def processors(self):
+        return [Processor(p, self) for p in range(self.num_processors)]
@@ -0,0 +1,74 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+import kernels
+
+# gaps checked one by one before switching to a vectorized search
+SCAN = 16
+
+
+class Timeline:
+    """
+    Sorted, non-overlapping busy intervals of one resource (a processor lane).
+
+    The gaps between consecutive intervals are the insertion slots of the
+    list schedulers, so an earliest-start query bisects straight to the first
+    slot that is long enough instead of rebuilding every free interval.
+    Lanes crowded with short gaps (e.g. thousands of reservations) are
+    searched past the first few gaps on a cached NumPy copy of the bounds.
+    """
+    __slots__ = ('starts', 'ends', 'ids', '__arrays')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.__arrays = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def earliest_start(self, ready, duration):
+        # the idle time before the first interval only counts as a slot if
+        # the resource is not busy from time 0
+        starts, ends = self.starts, self.ends
+        i = bisect_left(starts, ready + duration)
+        if i == 0 and starts and starts[0] == 0:
+            i = 1
+        stop = min(len(starts), i + SCAN)
+        while i < stop:
+            slot_start = ends[i-1] if i > 0 else 0
+            est = ready if ready >= slot_start else slot_start
+            if est + duration <= starts[i]:
+                return est
+            i += 1
+        if i < len(starts):
+            # same test on the remaining gaps, on arrays; here i > 0
+            if self.__arrays is None:
+                self.__arrays = (np.array(starts, dtype=float), np.array(ends, dtype=float))
+            est = kernels.first_fit(*self.__arrays, i, ready, duration)
+            if est is not None:
+                return est
+        if not ends:
+            return ready
+        return ready if ready >= ends[-1] else ends[-1]
+
+    def insert(self, start, end, ident=-1):
+        # keep (start, end) order so a zero-length interval never sits after
+        # a longer one starting at the same time; otherwise the gap after it
+        # would look free while the longer interval is still running
+        i = bisect_right(self.starts, start)
+        while i > 0 and self.starts[i-1] == start and self.ends[i-1] > end:
+            i -= 1
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, ident)
+        self.__arrays = None
+        return i
+
+    def remove(self, start, ident=-1):
+        i = bisect_left(self.starts, start)
+        while self.ids[i] != ident:
+            i += 1
+        del self.starts[i], self.ends[i], self.ids[i]
+        self.__arrays = None
+        return i
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+def edge_range(ptr, nodes):
+    # concatenated CSR slices ptr[v]:ptr[v+1] of every v in nodes
+    nodes = np.asarray(nodes)
+    counts = ptr[nodes + 1] - ptr[nodes]
+    offsets = np.repeat(ptr[nodes] - (np.cumsum(counts) - counts), counts)
+    return np.arange(counts.sum()) + offsets
+
+
+def as_topology(graph):
+    # schedulers take read_dag's adjacency matrix or, for graphs too large
+    # for a dense matrix, a Topology
+    return graph if isinstance(graph, Topology) else Topology.from_matrix(graph)
+
+
+class Topology:
+    """
+    Edge list of a task DAG in compressed sparse row form.
+
+    Built once from the adjacency matrix returned by read_dag (-1 = no edge),
+    or directly from an edge list for graphs too large for a matrix, so
+    schedulers can walk successors / predecessors without scanning a full
+    matrix row or column per task.
+    """
+
+    def __init__(self, num_tasks, src, dst, cost):
+        """
+        @param num_tasks: number of tasks
+        @param src, dst: edge endpoints
+        @param cost: communication cost of each edge
+        """
+        self.num_tasks = num_tasks
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        cost = np.asarray(cost, dtype=float)
+        self.num_edges = len(src)
+
+        # successors grouped by source, ascending destination
+        order = np.lexsort((dst, src))
+        self.src, self.dst, self.cost = src[order], dst[order], cost[order]
+        self.succ_ptr = np.zeros(num_tasks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=num_tasks),
+                  out=self.succ_ptr[1:])
+
+        # predecessors grouped by destination, ascending source; pred_edge
+        # maps back to the edge index in the successor ordering
+        self.pred_edge = np.lexsort((self.src, self.dst))
+        self.pred_idx = self.src[self.pred_edge]
+        self.pred_cost = self.cost[self.pred_edge]
+        self.pred_ptr = np.zeros(num_tasks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.dst, minlength=num_tasks),
+                  out=self.pred_ptr[1:])
+
+        # order: a topological order; level: longest edge count from an entry;
+        # levels: the tasks of each level, in level order
+        self.levels = self.__topological_levels()
+        self.order = (np.concatenate(self.levels) if self.levels
+                      else np.zeros(0, dtype=np.int64))
+        self.level = np.zeros(num_tasks, dtype=np.int64)
+        for i, tasks in enumerate(self.levels):
+            self.level[tasks] = i
+        self.__reachability = None
+
+    @classmethod
+    def from_matrix(cls, graph):
+        graph = np.asarray(graph)
+        src, dst = np.nonzero(graph != -1)
+        return cls(len(graph), src, dst, graph[src, dst])
+
+    @property
+    def reachability(self):
+        # Reachability index, built on first use and shared by every
+        # schedule holding this topology
+        if self.__reachability is None:
+            from reachability import Reachability
+            self.__reachability = Reachability(self)
+        return self.__reachability
+
+    @property
+    def cached_reachability(self):
+        # the index if something already built it, else None (never builds)
+        return self.__reachability
+
+    @property
+    def entries(self):
+        return np.nonzero(np.diff(self.pred_ptr) == 0)[0]
+
+    @property
+    def exits(self):
+        return np.nonzero(np.diff(self.succ_ptr) == 0)[0]
+
+    def __topological_levels(self):
+        # Kahn's algorithm, processed level by level
+        indeg = np.bincount(self.dst, minlength=self.num_tasks)
+        frontier = np.nonzero(indeg == 0)[0]
+        levels = []
+        while frontier.size:
+            levels.append(frontier)
+            succ = self.dst[edge_range(self.succ_ptr, frontier)]
+            np.subtract.at(indeg, succ, 1)
+            succ = np.unique(succ)
+            frontier = succ[indeg[succ] == 0]
+        if sum(len(tasks) for tasks in levels) != self.num_tasks:
+            raise ValueError('task graph contains a cycle')
+        return levels
+
+    def successors(self, t):
+        lo, hi = self.succ_ptr[t], self.succ_ptr[t+1]
+        return self.dst[lo:hi], self.cost[lo:hi]
+
+    def predecessors(self, t):
+        lo, hi = self.pred_ptr[t], self.pred_ptr[t+1]
+        return self.pred_idx[lo:hi], self.pred_cost[lo:hi]
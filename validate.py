@@ -0,0 +1,173 @@
+import numpy as np
+from comm import CommModel
+from topology import as_topology, edge_range
+
+
+def validate_schedule(proc_id, start, end, comp_cost, graph, duplicates=None, comm=None, tol=1e-9):
+    """
+    Check that a schedule is feasible, in O(E + N log N).
+
+    @param proc_id, start, end: processor, start and finish time of each task
+    @param comp_cost: (num_tasks, num_processors) computation cost matrix
+    @param graph: adjacency matrix as returned by read_dag, or a Topology
+    @param duplicates: optional (task, proc, start, end) arrays of extra task
+                       copies; a copy must itself receive all of its inputs,
+                       and a successor may use any copy of a predecessor
+    @param comm: CommModel giving message times, uniform if None
+    @param tol: relative tolerance for floating point comparisons
+    @return: list of violation messages, empty if the schedule is feasible
+    """
+    proc_id = np.asarray(proc_id)
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    comp_cost = np.asarray(comp_cost, dtype=float)
+    topology = as_topology(graph)
+    num_tasks, num_processors = comp_cost.shape
+    if comm is None:
+        comm = CommModel.uniform(num_processors)
+    errors = []
+
+    unscheduled = np.flatnonzero((proc_id < 0) | (proc_id >= num_processors) |
+                                 np.isnan(start) | np.isnan(end))
+    for t in unscheduled:
+        errors.append('Task {} is not scheduled'.format(t))
+    if unscheduled.size:
+        return errors
+
+    # every copy of every task: primaries are instances 0..num_tasks-1
+    task = np.arange(num_tasks)
+    if duplicates is not None and len(duplicates[0]):
+        task = np.concatenate([task, np.asarray(duplicates[0], dtype=np.int64)])
+        proc_id = np.concatenate([proc_id, duplicates[1]]).astype(np.int64)
+        start = np.concatenate([start, np.asarray(duplicates[2], dtype=float)])
+        end = np.concatenate([end, np.asarray(duplicates[3], dtype=float)])
+    eps = tol * max(1.0, float(np.max(np.abs(end))) if num_tasks else 1.0)
+
+    def name(i):
+        return 'Task {}'.format(task[i]) if i < num_tasks else 'Copy of task {}'.format(task[i])
+
+    # 1. duration matches the computation cost on the chosen processor
+    w = comp_cost[task, proc_id]
+    for i in np.flatnonzero(np.abs((end - start) - w) > eps):
+        errors.append('{} runs {} on processor {}, expected {}'.format(
+            name(i), end[i] - start[i], proc_id[i], w[i]))
+    for i in np.flatnonzero(start < -eps):
+        errors.append('{} starts before 0'.format(name(i)))
+
+    # 2. no two tasks overlap on a processor: sort by (processor, start, end)
+    # and compare neighbours
+    order = np.lexsort((end, start, proc_id))
+    same = proc_id[order[1:]] == proc_id[order[:-1]]
+    overlap = same & (start[order[1:]] < end[order[:-1]] - eps)
+    for i in np.flatnonzero(overlap):
+        a, b = order[i], order[i+1]
+        errors.append('{} [{}, {}] and {} [{}, {}] overlap on processor {}'.format(
+            name(a), start[a], end[a], name(b).lower(), start[b], end[b], proc_id[a]))
+
+    # 3. precedence: every copy of a task starts after the data of each
+    # predecessor arrives from its earliest delivering copy; communication
+    # is free on the same processor
+    pair_edge = edge_range(topology.pred_ptr, task)
+    pair_cons = np.repeat(np.arange(len(task)),
+                          topology.pred_ptr[task + 1] - topology.pred_ptr[task])
+    if pair_edge.size:
+        # producers of each pair: all copies of the predecessor
+        pair_pred = topology.pred_idx[pair_edge]
+        by_task = np.argsort(task, kind='stable')
+        prod_ptr = np.zeros(num_tasks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(task, minlength=num_tasks), out=prod_ptr[1:])
+        prod = by_task[edge_range(prod_ptr, pair_pred)]
+        counts = prod_ptr[pair_pred + 1] - prod_ptr[pair_pred]
+        cons = np.repeat(pair_cons, counts)
+        c = comm.cost(np.repeat(topology.pred_cost[pair_edge], counts),
+                      proc_id[prod], proc_id[cons])
+        ready = np.minimum.reduceat(end[prod] + c, np.cumsum(counts) - counts)
+        for k in np.flatnonzero(ready > start[pair_cons] + eps):
+            i = pair_cons[k]
+            errors.append('Edge {} -> {}: data ready at {}, {} starts at {}'.format(
+                pair_pred[k], task[i], ready[k], name(i).lower(), start[i]))
+
+    return errors
+
+
+def validate_messages(schedule, tol=1e-9):
+    """
+    Check the link bookings of a schedule built with link contention: each
+    remote input travels as a message that leaves after its producer ends,
+    lasts its message time and arrives before the consumer starts, and
+    messages sharing a link do not overlap.
+
+    @return: list of violation messages, empty if the bookings are feasible
+    """
+    topo = schedule.topology
+    n, P = schedule.num_tasks, schedule.num_processors
+    errors = []
+    eps = tol * max(1.0, float(np.max(np.abs(schedule.end))) if n else 1.0)
+
+    # remote edges with a positive message time need a message
+    duration = schedule.comm.cost(topo.cost, schedule.proc_id[topo.src],
+                                  schedule.proc_id[topo.dst])
+    needed = np.flatnonzero(duration > 0)
+    if schedule.messages:
+        pred, task, src, dst, start, end = (np.array(x) for x in zip(*schedule.messages))
+    else:
+        pred = task = src = dst = np.zeros(0, dtype=np.int64)
+        start = end = np.zeros(0)
+    edge_key = topo.src * n + topo.dst
+    msg_edge = np.searchsorted(edge_key, pred * n + task)
+    for e in needed[~np.isin(needed, msg_edge)]:
+        errors.append('Edge {} -> {}: no message booked'.format(topo.src[e], topo.dst[e]))
+
+    for i in range(len(task)):
+        e = msg_edge[i]
+        if src[i] != schedule.proc_id[pred[i]] or dst[i] != schedule.proc_id[task[i]]:
+            errors.append('Message {} -> {} uses link {} -> {}, tasks run on {} and {}'.format(
+                pred[i], task[i], src[i], dst[i],
+                schedule.proc_id[pred[i]], schedule.proc_id[task[i]]))
+        elif start[i] < schedule.end[pred[i]] - eps or end[i] > schedule.start[task[i]] + eps:
+            errors.append('Message {} -> {} [{}, {}] outside [{}, {}]'.format(
+                pred[i], task[i], start[i], end[i],
+                schedule.end[pred[i]], schedule.start[task[i]]))
+        elif abs(end[i] - start[i] - duration[e]) > eps:
+            errors.append('Message {} -> {} takes {}, expected {}'.format(
+                pred[i], task[i], end[i] - start[i], duration[e]))
+
+    link = np.zeros(len(task), dtype=np.int64) if schedule.contention == 'bus' else src * P + dst
+    order = np.lexsort((end, start, link))
+    same = link[order[1:]] == link[order[:-1]]
+    for i in np.flatnonzero(same & (start[order[1:]] < end[order[:-1]] - eps)):
+        a, b = order[i], order[i+1]
+        errors.append('Messages {} -> {} and {} -> {} overlap on link {} -> {}'.format(
+            pred[a], task[a], pred[b], task[b], src[a], dst[a]))
+    return errors
+
+
+def validate_reservations(schedule, tol=1e-9):
+    # no task copy may run inside a reserved interval of its processor
+    task, proc, start, end = schedule.instances()
+    num = len(task)
+    proc = np.concatenate([proc, schedule.res_proc]).astype(np.int64)
+    start = np.concatenate([start, schedule.res_start])
+    end = np.concatenate([end, schedule.res_end])
+    eps = tol * max(1.0, float(np.max(np.abs(schedule.end))) if num else 1.0)
+    errors = []
+    order = np.lexsort((end, start, proc))
+    a, b = order[:-1], order[1:]
+    clash = (proc[a] == proc[b]) & (start[b] < end[a] - eps) & ((a >= num) != (b >= num))
+    for i in np.flatnonzero(clash):
+        t, r = (a[i], b[i]) if a[i] < num else (b[i], a[i])
+        errors.append('Task {} [{}, {}] runs in reservation [{}, {}] of processor {}'.format(
+            task[t], start[t], end[t], start[r], end[r], proc[r]))
+    return errors
+
+
+def validate(schedule):
+    # validate a Schedule against the topology it was built with
+    duplicates = (schedule.dup_task, schedule.dup_proc,
+                  schedule.dup_start, schedule.dup_end)
+    errors = validate_schedule(schedule.proc_id, schedule.start, schedule.end,
+                               schedule.comp_cost, schedule.topology, duplicates,
+                               schedule.comm)
+    if schedule.contention is not None and not errors:
+        errors = validate_messages(schedule)
+    return errors + validate_reservations(schedule)